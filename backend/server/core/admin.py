@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import QuizQuestion, TranscriptionJob
+
+
+@admin.register(TranscriptionJob)
+class TranscriptionJobAdmin(admin.ModelAdmin):
+    list_display = ("video_id", "status", "progress", "method", "created_at")
+    list_filter = ("status",)
+
+
+@admin.register(QuizQuestion)
+class QuizQuestionAdmin(admin.ModelAdmin):
+    list_display = ("video_id", "chunk_index", "style", "times_served", "created_at")
+    list_filter = ("style",)
+    search_fields = ("video_id", "question")
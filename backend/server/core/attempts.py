@@ -0,0 +1,36 @@
+"""
+Per-student, per-lecture quiz attempt counters.
+
+One QuizAttempt row per (student, video); increments are a single
+UPDATE ... SET count = count + 1, so concurrent quiz requests never
+lose updates. Requests without a student id share the "" row.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import QuizAttempt
+
+
+def get_attempt(video_id, student_id=""):
+    count = (
+        QuizAttempt.objects
+        .filter(student_id=student_id, video_id=video_id)
+        .values_list("count", flat=True)
+        .first()
+    )
+    return count or 0
+
+
+def increase_attempt(video_id, student_id=""):
+    rows = QuizAttempt.objects.filter(student_id=student_id, video_id=video_id)
+
+    if rows.update(count=F("count") + 1):
+        return
+
+    # First attempt: create the row, unless a concurrent request just did
+    try:
+        with transaction.atomic():
+            QuizAttempt.objects.create(student_id=student_id, video_id=video_id, count=1)
+    except IntegrityError:
+        rows.update(count=F("count") + 1)
@@ -0,0 +1,285 @@
+"""
+Background transcription jobs.
+
+submit_video enqueues a TranscriptionJob row and returns immediately;
+a process pool downloads the audio, runs Whisper and saves the
+transcript while the job row tracks status and progress.
+"""
+
+import fcntl
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .models import TranscriptionJob
+
+_executor = None
+_executor_lock = threading.Lock()
+# Job ids handed to this process's pool
+_submitted = set()
+
+
+# ==================================================
+# WORKER SIDE
+# ==================================================
+def _init_worker():
+    """
+    Pool processes are spawned fresh, so Django has to be set up again
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+
+    import django
+    django.setup()
+
+
+def _update(job_id, **fields):
+    TranscriptionJob.objects.filter(pk=job_id).update(**fields)
+
+
+@contextmanager
+def _video_lock(video_id):
+    """
+    Per-video lock file so only one worker process transcribes a lecture.
+
+    Yields False if another process already holds it. flock is released
+    by the OS if the holder dies, so crashed workers leave no stale lock.
+    """
+    from .utils.transcript_store import artifact_path
+
+    fd = os.open(artifact_path(video_id, ".lock"), os.O_CREAT | os.O_RDWR)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def run_transcription_job(job_id, downloader_path):
+    """
+    Download + transcribe + save one lecture, recording progress on the job row
+    """
+    close_old_connections()
+
+    try:
+        job = TranscriptionJob.objects.get(pk=job_id)
+
+        with _video_lock(job.video_id) as acquired:
+            if not acquired:
+                # Another worker already owns this lecture (e.g. a duplicate
+                # resume after restart); it will finish the job row
+                print(f"⏭️ Job {job_id}: {job.video_id} already in progress")
+                return
+
+            _run_locked(job, downloader_path)
+
+    finally:
+        close_old_connections()
+
+
+def _run_locked(job, downloader_path):
+    from django.utils.module_loading import import_string
+
+    from .utils.embeddings import embeddings_available, get_lecture_vectors
+    from .utils.retrieval import get_retrieval_index
+    from .utils.search_index import index_transcript
+    from .utils.transcriber import transcribe_audio, transcribe_stream
+    from .utils.transcript_store import load_transcript, save_transcript, transcript_exists
+
+    job_id = job.pk
+    audio_path = None
+
+    try:
+        if transcript_exists(job.video_id):
+            _update(job_id, status=TranscriptionJob.STATUS_DONE, progress=1.0)
+            return
+
+        def on_progress(stage, progress):
+            _update(job_id, status=stage, progress=progress)
+
+        _update(job_id, status=TranscriptionJob.STATUS_DOWNLOADING, progress=0.1)
+
+        if settings.TRANSCRIPTION_STREAMING:
+            # Download and transcription overlap; no audio file on disk
+            data = transcribe_stream(
+                job.youtube_url,
+                youtube_url=job.youtube_url,
+                on_progress=on_progress,
+            )
+        else:
+            download_audio = import_string(downloader_path)
+            audio_path = download_audio(job.youtube_url)
+
+            data = transcribe_audio(
+                audio_path,
+                youtube_url=job.youtube_url,
+                on_progress=on_progress,
+            )
+
+        save_transcript(job.video_id, data)
+
+        # Build the chatbot retrieval index now rather than on the first question
+        transcript = load_transcript(job.video_id)
+        get_retrieval_index(transcript)
+
+        try:
+            index_transcript(transcript)
+        except Exception as e:
+            print(f"❌ Search index {job.video_id} failed: {e}")
+
+        try:
+            if embeddings_available():
+                get_lecture_vectors(transcript)
+        except Exception as e:
+            print(f"❌ Embeddings {job.video_id} failed: {e}")
+
+        _update(
+            job_id,
+            status=TranscriptionJob.STATUS_DONE,
+            progress=1.0,
+            method=data.get("source", "unknown"),
+        )
+        print(f"✅ Job {job_id}: {len(data.get('timeline', []))} segments")
+
+        if getattr(settings, "QUIZ_BANK_BUILD_ON_TRANSCRIBE", True):
+            _build_question_bank(job.video_id)
+
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        traceback.print_exc()
+        _update(job_id, status=TranscriptionJob.STATUS_FAILED, error=str(e))
+
+    finally:
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+
+def _build_question_bank(video_id):
+    from .question_bank import build_initial_bank
+
+    # The transcript is already usable; a failed bank build only means
+    # quizzes fall back to live generation
+    try:
+        build_initial_bank(video_id)
+    except Exception as e:
+        print(f"❌ Question bank {video_id} failed: {e}")
+
+
+# ==================================================
+# WEB SIDE
+# ==================================================
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.TRANSCRIPTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # Pick up work that was in flight when the server last stopped
+            resume_pending_jobs(_executor)
+
+    return _executor
+
+
+def is_orphaned(job):
+    """
+    True if no worker is running or about to run an active job: this
+    process did not queue it and its lecture lock is free (e.g. the
+    process that queued it was restarted)
+    """
+    if job.pk in _submitted:
+        return False
+
+    with _video_lock(job.video_id) as acquired:
+        return acquired
+
+
+def _start(job, executor):
+    if executor is None:
+        # Tests / debugging: run inside the calling process
+        run_transcription_job(job.pk, settings.TRANSCRIPTION_DOWNLOADER)
+        job.refresh_from_db()
+        return
+
+    _submitted.add(job.pk)
+    executor.submit(
+        run_transcription_job,
+        job.pk,
+        settings.TRANSCRIPTION_DOWNLOADER,
+    )
+
+
+def resume_pending_jobs(executor):
+    """
+    Requeue orphaned jobs left unfinished by a previous run. Jobs another
+    process is still running hold their lecture lock and are left alone.
+    """
+    pending = TranscriptionJob.objects.filter(
+        status__in=TranscriptionJob.ACTIVE_STATUSES
+    )
+
+    for job in pending:
+        if is_orphaned(job):
+            _update(job.pk, status=TranscriptionJob.STATUS_QUEUED, progress=0.0)
+            _start(job, executor)
+
+
+def _active_job(video_id):
+    return TranscriptionJob.objects.filter(
+        video_id=video_id,
+        status__in=TranscriptionJob.ACTIVE_STATUSES,
+    ).first()
+
+
+def enqueue_transcription(video_id, youtube_url):
+    """
+    Create a job row and hand it to the worker pool.
+
+    Single-flight: if the lecture already has an in-progress job, that
+    job is returned instead and no new work starts (unless the job was
+    orphaned, see is_orphaned). Returns (job, created).
+    """
+    eager = settings.TRANSCRIPTION_WORKERS <= 0
+    # Creating the pool also resumes jobs orphaned by a restart
+    executor = None if eager else _get_executor()
+
+    existing = _active_job(video_id)
+    if existing is not None:
+        if is_orphaned(existing):
+            _update(existing.pk, status=TranscriptionJob.STATUS_QUEUED, progress=0.0)
+            _start(existing, executor)
+            existing.refresh_from_db()
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            job = TranscriptionJob.objects.create(
+                video_id=video_id,
+                youtube_url=youtube_url,
+            )
+    except IntegrityError:
+        # Lost the race against a concurrent submit; attach to its job
+        job = (
+            _active_job(video_id)
+            or TranscriptionJob.objects.filter(video_id=video_id).first()
+        )
+        return job, False
+
+    _start(job, executor)
+    return job, True
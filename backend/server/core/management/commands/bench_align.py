@@ -0,0 +1,54 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils.transcriber import _align_pairwise, align_whisper_to_youtube
+
+
+def make_segments(rng, count, key, overlap):
+    segments = []
+    t = 0.0
+    for i in range(count):
+        start = round(t, 2)
+        end = round(start + rng.uniform(1.0, 4.0), 2)
+        segments.append({"start": start, "end": end, key: f" segment {i} "})
+        t = start + rng.uniform(1.0, 3.0) * (0.7 if overlap else 1.0)
+    return segments
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark Whisper/YouTube alignment: sweep vs pairwise scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segments", type=int, default=10_000)
+        parser.add_argument("--captions", type=int, default=10_000)
+        parser.add_argument("--skip-pairwise", action="store_true",
+                            help="Only time the sweep (the pairwise scan is slow at 10k x 10k)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        whisper_segments = make_segments(rng, options["segments"], "text", overlap=False)
+        youtube_timestamps = make_segments(rng, options["captions"], "youtube_text", overlap=True)
+        self.stdout.write(f"{len(whisper_segments)} Whisper segments x {len(youtube_timestamps)} captions")
+
+        t0 = time.perf_counter()
+        sweep = align_whisper_to_youtube({"segments": whisper_segments}, youtube_timestamps)
+        sweep_time = time.perf_counter() - t0
+        self.stdout.write(f"sweep    : {sweep_time * 1000:10.1f} ms")
+
+        if options["skip_pairwise"]:
+            return
+
+        t0 = time.perf_counter()
+        pairwise = _align_pairwise(whisper_segments, youtube_timestamps)
+        pairwise_time = time.perf_counter() - t0
+        self.stdout.write(f"pairwise : {pairwise_time * 1000:10.1f} ms")
+
+        if sweep != pairwise:
+            self.stderr.write(self.style.ERROR("Outputs differ!"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"identical output, speedup {pairwise_time / sweep_time:.0f}x"
+        ))
@@ -0,0 +1,60 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from core.utils import engagement
+from core.utils.engagement import LABELS, aggregate, load_samples, segment_bounds
+
+
+class Command(BaseCommand):
+    help = "Benchmark engagement ingest (one sample per session per second) and aggregation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=5000)
+        parser.add_argument("--seconds", type=int, default=600, help="Lecture length watched per session")
+        parser.add_argument("--segments", type=int, default=400, help="Transcript timeline segments")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        sessions, seconds = options["sessions"], options["seconds"]
+
+        step = seconds / options["segments"]
+        timeline = [{"start": i * step, "end": (i + 1) * step, "text": ""} for i in range(options["segments"])]
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("core.utils.transcript_store.TRANSCRIPT_DIR", Path(tmp)):
+            log = engagement.EngagementLog()
+
+            # Every session reports once per video second, as the webcam loop does
+            t0 = time.perf_counter()
+            for t in range(seconds):
+                for s in range(sessions):
+                    log.append("bench", s, [(t + rng.random(), rng.choice(LABELS), rng.random())])
+            log.flush()
+            ingest_time = time.perf_counter() - t0
+
+            total = sessions * seconds
+            self.stdout.write(
+                f"ingest    : {total} samples in {ingest_time:.2f} s "
+                f"({total / ingest_time:,.0f}/s, need {sessions:,}/s)"
+            )
+
+            t0 = time.perf_counter()
+            samples = load_samples("bench")
+            starts, ends = segment_bounds(timeline)
+            counts, distinct = aggregate(samples, starts, ends)
+            aggregate_time = time.perf_counter() - t0
+
+            self.stdout.write(
+                f"aggregate : {len(samples)} samples -> {len(starts)} segments in {aggregate_time * 1000:.1f} ms"
+            )
+
+            if counts.sum() != total:
+                self.stderr.write(self.style.ERROR("Sample counts differ!"))
+                return
+
+        self.stdout.write(self.style.SUCCESS(f"max sessions per segment: {distinct.max()}"))
@@ -0,0 +1,45 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils import quiz_generator
+from core.utils.fake_llm import FakeQuizLLM
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark quiz generation latency (sequential vs concurrent) against a fake LLM"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--median-ms", type=float, default=800)
+        parser.add_argument("--failure-rate", type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        transcript = " ".join(f"word{i}" for i in range(140 * 12))
+
+        for concurrency in (1, options["concurrency"]):
+            llm = FakeQuizLLM(
+                median_ms=options["median_ms"],
+                failure_rate=options["failure_rate"],
+                seed=concurrency,
+            )
+            latencies = []
+
+            for _ in range(options["runs"]):
+                t0 = time.perf_counter()
+                quiz_generator.generate_quiz(transcript, llm=llm, concurrency=concurrency)
+                latencies.append(time.perf_counter() - t0)
+
+            self.stdout.write(
+                f"concurrency={concurrency:<2} "
+                f"p50={statistics.median(latencies) * 1000:7.0f} ms  "
+                f"p95={percentile(latencies, 95) * 1000:7.0f} ms  "
+                f"llm calls={llm.calls}"
+            )
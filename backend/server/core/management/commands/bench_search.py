@@ -0,0 +1,67 @@
+import itertools
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from core.utils.search_index import index_transcript, search
+from core.utils.transcript_store import load_transcript, save_transcript
+
+
+class Command(BaseCommand):
+    help = "Benchmark full-text search latency over a synthetic lecture corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lectures", type=int, default=500)
+        parser.add_argument("--segments", type=int, default=600, help="Timeline segments per lecture")
+        parser.add_argument("--vocabulary", type=int, default=20000)
+        parser.add_argument("--queries", type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        # Zipf-like word frequencies, as in speech
+        words = [f"w{i}" for i in range(options["vocabulary"])]
+        cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(words))))
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("core.utils.transcript_store.TRANSCRIPT_DIR", Path(tmp)):
+            t0 = time.perf_counter()
+            for n in range(options["lectures"]):
+                video_id = f"bench{n:05d}"
+                timeline = [
+                    {
+                        "start": i * 5.0,
+                        "end": (i + 1) * 5.0,
+                        "text": " ".join(rng.choices(words, cum_weights=cum_weights, k=12)),
+                    }
+                    for i in range(options["segments"])
+                ]
+                save_transcript(video_id, {
+                    "full_text": " ".join(s["text"] for s in timeline),
+                    "timeline": timeline,
+                    "source": "bench",
+                })
+                index_transcript(load_transcript(video_id))
+            index_time = time.perf_counter() - t0
+
+            self.stdout.write(f"index  : {options['lectures']} lectures in {index_time:.1f} s")
+
+            search("w1")  # connection + schema
+            latencies, hits = [], 0
+            for _ in range(options["queries"]):
+                query = " ".join(rng.choices(words[100:], k=rng.randint(1, 3)))
+                t0 = time.perf_counter()
+                hits += len(search(query, k=20))
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        latencies.sort()
+        self.stdout.write(
+            f"search : p50 {statistics.median(latencies):.2f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, "
+            f"{hits / len(latencies):.1f} hits/query"
+        )
+        self.stdout.write(self.style.SUCCESS("done"))
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils.audio import probe_duration
+from core.utils.chunked_transcriber import transcribe_chunked
+from core.utils.transcriber import WHISPER_OPTIONS, get_model
+
+
+def make_fixture(path, seconds):
+    """
+    Synthetic lecture stand-in: pink noise with a slow tone sweep
+    """
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.05:d={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=220:d={seconds}",
+            "-filter_complex", "amix=inputs=2",
+            "-ac", "1", "-ar", "16000",
+            path,
+        ],
+        check=True,
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare single-call vs chunked parallel Whisper transcription wall-clock time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--audio", help="Audio file to use instead of the synthetic fixture")
+        parser.add_argument("--seconds", type=int, default=600, help="Synthetic fixture length")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--window", type=int, default=getattr(settings, "WHISPER_CHUNK_SECONDS", 300))
+        parser.add_argument("--overlap", type=int, default=getattr(settings, "WHISPER_CHUNK_OVERLAP", 5))
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            audio_path = options["audio"]
+            if not audio_path:
+                audio_path = os.path.join(tmp, "fixture.wav")
+                make_fixture(audio_path, options["seconds"])
+
+            duration = probe_duration(audio_path)
+            self.stdout.write(f"Audio: {duration:.0f}s, workers={options['workers']}")
+
+            model = get_model()
+            t0 = time.perf_counter()
+            model.transcribe(audio_path, **WHISPER_OPTIONS)
+            single = time.perf_counter() - t0
+            self.stdout.write(f"single call : {single:8.2f}s")
+
+            t0 = time.perf_counter()
+            transcribe_chunked(
+                audio_path,
+                duration,
+                WHISPER_OPTIONS,
+                model_size=getattr(settings, "WHISPER_MODEL_SIZE", "tiny"),
+                device=getattr(settings, "WHISPER_DEVICE", None),
+                workers=options["workers"],
+                window_seconds=options["window"],
+                overlap_seconds=options["overlap"],
+            )
+            chunked = time.perf_counter() - t0
+            self.stdout.write(f"chunked     : {chunked:8.2f}s")
+
+            self.stdout.write(self.style.SUCCESS(f"speedup     : {single / chunked:8.2f}x"))
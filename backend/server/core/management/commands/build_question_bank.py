@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.question_bank import bank_size, build_question_bank
+from core.utils.quiz_generator import PROMPTS_BY_STYLE
+from core.utils.transcript_store import transcript_exists
+
+
+class Command(BaseCommand):
+    help = "Pre-generate quiz questions for one or more lectures"
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="+")
+        parser.add_argument("--style", action="append", choices=list(PROMPTS_BY_STYLE), dest="styles",
+                            help="Only these question styles (default: all)")
+        parser.add_argument("--max-calls", type=int, help="Stop after this many LLM calls per lecture")
+        parser.add_argument("--calls-per-minute", type=float,
+                            default=getattr(settings, "QUIZ_BANK_CALLS_PER_MINUTE", None),
+                            help="Pace LLM calls (default: QUIZ_BANK_CALLS_PER_MINUTE; 0 = no pacing)")
+
+    def handle(self, *args, **options):
+        for video_id in options["video_ids"]:
+            if not transcript_exists(video_id):
+                raise CommandError(f"No transcript for {video_id}")
+
+            added = build_question_bank(
+                video_id,
+                styles=options["styles"],
+                max_calls=options["max_calls"],
+                calls_per_minute=options["calls_per_minute"],
+            )
+            self.stdout.write(f"{video_id}: +{added} questions ({bank_size(video_id)} in bank)")
@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.emotion.model_loader import EmotionModelUnavailable, KerasBackend, load_model
+
+
+class Command(BaseCommand):
+    help = "Convert the Keras emotion checkpoint to TFLite for CPU inference"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=getattr(settings, "EMOTION_TFLITE_PATH", None),
+            help="Output path (defaults to settings.EMOTION_TFLITE_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        import tensorflow as tf
+
+        output = options["output"]
+        if not output:
+            raise CommandError("Pass --output or set EMOTION_TFLITE_PATH")
+
+        try:
+            backend = load_model()
+        except EmotionModelUnavailable as e:
+            raise CommandError(str(e))
+
+        if not isinstance(backend, KerasBackend):
+            raise CommandError(f"{backend.path} is already a TFLite model")
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(backend.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "wb") as f:
+            f.write(converter.convert())
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {backend.path} -> {output}"))
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+
+from core.utils import transcript_store
+from core.utils.transcript_store import (
+    binary_path,
+    load_transcript,
+    parse_transcript,
+    read_offset_index,
+    save_transcript,
+    write_offset_index,
+)
+
+
+def legacy_files(transcript_dir):
+    """
+    <video_id>.txt / <video_id>.json transcripts (not artifacts like .idx.json)
+    """
+    for path in sorted(transcript_dir.iterdir()):
+        if path.suffix in (".txt", ".json") and "." not in path.stem:
+            yield path.stem, path
+
+
+def unindexed_files(transcript_dir):
+    """
+    Binary transcripts whose offset index is missing or stale
+    """
+    for path in sorted(transcript_dir.glob("*.tbin")):
+        if read_offset_index(path.stem, path.stat().st_mtime_ns) is None:
+            yield path.stem
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert legacy JSON / plain-text transcripts to the binary .tbin format "
+        "and rebuild missing offset indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", help="Only these lectures (default: all)")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be converted")
+
+    def handle(self, *args, **options):
+        wanted = set(options["video_ids"])
+        converted = failed = before = after = 0
+
+        for video_id, path in legacy_files(transcript_store.TRANSCRIPT_DIR):
+            if wanted and video_id not in wanted:
+                continue
+
+            try:
+                transcript = parse_transcript(video_id, path.read_text(encoding="utf-8"))
+            except (UnicodeDecodeError, ValueError) as e:
+                self.stderr.write(self.style.ERROR(f"{video_id}: {e}"))
+                failed += 1
+                continue
+
+            size = path.stat().st_size
+            if options["dry_run"]:
+                self.stdout.write(f"{video_id}: {size} bytes ({path.name})")
+                continue
+
+            save_transcript(video_id, transcript.as_dict())
+            path.unlink(missing_ok=True)  # save_transcript only clears <video_id>.txt
+
+            new_size = binary_path(video_id).stat().st_size
+            before += size
+            after += new_size
+            converted += 1
+            self.stdout.write(f"{video_id}: {size} -> {new_size} bytes")
+
+        indexed = 0
+        for video_id in unindexed_files(transcript_store.TRANSCRIPT_DIR):
+            if wanted and video_id not in wanted:
+                continue
+
+            if options["dry_run"]:
+                self.stdout.write(f"{video_id}: offset index missing")
+                continue
+
+            transcript = load_transcript(video_id)
+            write_offset_index(video_id, transcript.full_text, transcript.timeline, transcript.mtime)
+            indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {converted} transcript(s), {before} -> {after} bytes, "
+            f"indexed {indexed}"
+            + (f", {failed} failed" if failed else "")
+        ))
+
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.transcriber import get_model
+from core.utils.whisper_server import WhisperServer
+
+
+class Command(BaseCommand):
+    help = "Hold the Whisper model in one process and serve transcriptions over a Unix socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=getattr(settings, "WHISPER_SERVER_SOCKET", None),
+            help="Socket path (defaults to settings.WHISPER_SERVER_SOCKET)",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"]
+        if not socket_path:
+            raise CommandError("Pass --socket or set WHISPER_SERVER_SOCKET")
+
+        # Load locally here: this process *is* the model server
+        model = get_model()
+        server = WhisperServer(socket_path, model)
+
+        self.stdout.write(self.style.SUCCESS(f"Whisper server listening on {socket_path}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
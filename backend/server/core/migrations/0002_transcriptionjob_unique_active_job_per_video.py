@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='transcriptionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'downloading', 'transcribing', 'aligning'])), fields=('video_id',), name='unique_active_job_per_video'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_transcriptionjob_unique_active_job_per_video'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=64)),
+                ('chunk_index', models.PositiveIntegerField()),
+                ('chunk_end_offset', models.PositiveIntegerField()),
+                ('style', models.CharField(choices=[('basic', 'Basic'), ('concept', 'Concept'), ('scenario', 'Scenario'), ('output', 'Output'), ('true_false', 'True/False')], max_length=16)),
+                ('question', models.TextField()),
+                ('options', models.JSONField()),
+                ('correct_index', models.PositiveSmallIntegerField()),
+                ('explanation', models.TextField()),
+                ('times_served', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['video_id', 'chunk_index'],
+                'indexes': [models.Index(fields=['video_id', 'chunk_end_offset'], name='quiz_question_video_offset')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-18 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_quizattempt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudyProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.CharField(max_length=64)),
+                ('video_id', models.CharField(max_length=64)),
+                ('transcript_mtime', models.BigIntegerField(default=0)),
+                ('notes_offset', models.PositiveIntegerField(default=0)),
+                ('notes', models.TextField(blank=True)),
+                ('quiz_offset', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student_id', 'video_id'), name='unique_progress_per_student_video')],
+            },
+        ),
+    ]
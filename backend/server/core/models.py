@@ -1,3 +1,165 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class TranscriptionJob(models.Model):
+    """
+    Background download + transcription of one lecture
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_DOWNLOADING = "downloading"
+    STATUS_TRANSCRIBING = "transcribing"
+    STATUS_ALIGNING = "aligning"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_DOWNLOADING, "Downloading"),
+        (STATUS_TRANSCRIBING, "Transcribing"),
+        (STATUS_ALIGNING, "Aligning"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    ACTIVE_STATUSES = [
+        STATUS_QUEUED,
+        STATUS_DOWNLOADING,
+        STATUS_TRANSCRIBING,
+        STATUS_ALIGNING,
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    video_id = models.CharField(max_length=64, db_index=True)
+    youtube_url = models.URLField()
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        db_index=True,
+    )
+    progress = models.FloatField(default=0.0)
+    method = models.CharField(max_length=32, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            # Single-flight: at most one in-progress job per lecture
+            models.UniqueConstraint(
+                fields=["video_id"],
+                condition=models.Q(status__in=[
+                    "queued", "downloading", "transcribing", "aligning",
+                ]),
+                name="unique_active_job_per_video",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} ({self.status})"
+
+    def as_dict(self):
+        return {
+            "job_id": str(self.id),
+            "video_id": self.video_id,
+            "status": self.status,
+            "progress": round(self.progress, 2),
+            "method": self.method,
+            "error": self.error,
+        }
+
+
+class QuizQuestion(models.Model):
+    """
+    Pre-generated, validated MCQ for one transcript chunk of a lecture
+    """
+    STYLE_CHOICES = [
+        ("basic", "Basic"),
+        ("concept", "Concept"),
+        ("scenario", "Scenario"),
+        ("output", "Output"),
+        ("true_false", "True/False"),
+    ]
+
+    video_id = models.CharField(max_length=64)
+    chunk_index = models.PositiveIntegerField()
+    # Character offset in the transcript where the source chunk ends
+    chunk_end_offset = models.PositiveIntegerField()
+    style = models.CharField(max_length=16, choices=STYLE_CHOICES)
+    question = models.TextField()
+    options = models.JSONField()
+    correct_index = models.PositiveSmallIntegerField()
+    explanation = models.TextField()
+    times_served = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["video_id", "chunk_index"]
+        indexes = [
+            models.Index(
+                fields=["video_id", "chunk_end_offset"],
+                name="quiz_question_video_offset",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} #{self.chunk_index} ({self.style})"
+
+    def as_dict(self):
+        return {
+            "question": self.question,
+            "options": self.options,
+            "correct_index": self.correct_index,
+            "explanation": self.explanation,
+        }
+
+
+class QuizAttempt(models.Model):
+    """
+    Number of quizzes a student has taken for one lecture
+    """
+    student_id = models.CharField(max_length=64, blank=True)
+    video_id = models.CharField(max_length=64)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_id", "video_id"],
+                name="unique_attempt_per_student_video",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id or 'anonymous'} / {self.video_id}: {self.count}"
+
+
+class StudyProgress(models.Model):
+    """
+    How far a student's watched notes and quizzes have been built for one
+    lecture, so later requests only process the newly watched range
+    """
+    student_id = models.CharField(max_length=64)
+    video_id = models.CharField(max_length=64)
+    # Transcript file version the offsets refer to
+    transcript_mtime = models.BigIntegerField(default=0)
+    # Character offsets in the transcript already covered
+    notes_offset = models.PositiveIntegerField(default=0)
+    notes = models.TextField(blank=True)
+    quiz_offset = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_id", "video_id"],
+                name="unique_progress_per_student_video",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} / {self.video_id}: notes@{self.notes_offset} quiz@{self.quiz_offset}"
@@ -0,0 +1,139 @@
+"""
+Incremental watched notes and quizzes per (student, video).
+
+The frontend asks again as watched_seconds grows. A StudyProgress row
+remembers how far into the transcript the student's notes and quizzes
+already reach, so each request only summarizes (or draws questions
+from) the newly watched range. Offsets are reset when the transcript
+file changes.
+"""
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .models import StudyProgress
+from .utils.notes_generator import (
+    NOT_ENOUGH_CONTENT,
+    build_notes,
+    extend_notes,
+    has_enough_content,
+    stream_extension,
+    stream_notes,
+)
+
+# Less new text than this keeps the stored notes as they are (~30 s of speech)
+MIN_NEW_NOTES_WORDS = 80
+# A quiz needs at least one newly covered quiz chunk, else it reviews everything watched
+MIN_NEW_QUIZ_WORDS = 140
+
+WATCHED_TITLE = "Watched Notes"
+
+
+def get_progress(transcript, student_id):
+    progress, _ = StudyProgress.objects.get_or_create(student_id=student_id, video_id=transcript.video_id)
+
+    if progress.transcript_mtime != transcript.mtime:
+        # Re-transcribed lecture: old offsets point into different text
+        StudyProgress.objects.filter(pk=progress.pk).update(
+            transcript_mtime=transcript.mtime, notes_offset=0, notes="", quiz_offset=0,
+            updated_at=timezone.now(),
+        )
+        progress.refresh_from_db()
+
+    return progress
+
+
+def new_words(transcript, from_offset, upto_offset):
+    return len(transcript.full_text[from_offset:upto_offset].split())
+
+
+# ==================================================
+# NOTES
+# ==================================================
+def notes_are_current(transcript, progress, upto_offset):
+    return bool(progress.notes) and new_words(transcript, progress.notes_offset, upto_offset) < MIN_NEW_NOTES_WORDS
+
+
+def save_notes(progress, notes, upto_offset):
+    """
+    Store notes covering full_text[:upto_offset] unless a concurrent request
+    extended them first; returns whichever notes were kept
+    """
+    updated = StudyProgress.objects.filter(pk=progress.pk, notes_offset=progress.notes_offset).update(
+        notes=notes, notes_offset=upto_offset, updated_at=timezone.now(),
+    )
+    if updated:
+        return notes
+    return StudyProgress.objects.values_list("notes", flat=True).get(pk=progress.pk)
+
+
+def watched_notes(transcript, student_id, upto_offset):
+    """
+    The student's notes up to `upto_offset`: stored notes, extended with
+    notes for the range watched since they were built
+    """
+    if not has_enough_content(transcript, upto_offset):
+        return NOT_ENOUGH_CONTENT
+
+    progress = get_progress(transcript, student_id)
+    if notes_are_current(transcript, progress, upto_offset):
+        return progress.notes
+
+    if progress.notes:
+        notes = progress.notes + "\n\n" + extend_notes(transcript, progress.notes_offset, upto_offset)
+    else:
+        notes = build_notes(transcript, upto_offset, WATCHED_TITLE, "watched")
+
+    return save_notes(progress, notes, upto_offset)
+
+
+async def stream_watched_notes(transcript, student_id, upto_offset):
+    """
+    watched_notes, yielding the stored notes at once and then the new part
+    as it is generated. Stored only if the stream completes.
+    """
+    if not has_enough_content(transcript, upto_offset):
+        yield NOT_ENOUGH_CONTENT
+        return
+
+    progress = await sync_to_async(get_progress)(transcript, student_id)
+    if notes_are_current(transcript, progress, upto_offset):
+        yield progress.notes
+        return
+
+    if progress.notes:
+        prefix = progress.notes + "\n\n"
+        yield prefix
+        deltas = stream_extension(transcript, progress.notes_offset, upto_offset)
+    else:
+        prefix = ""
+        deltas = stream_notes(transcript, upto_offset, title=WATCHED_TITLE, mode="watched")
+
+    parts = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+    finally:
+        await deltas.aclose()
+
+    await sync_to_async(save_notes)(progress, prefix + "".join(parts), upto_offset)
+
+
+# ==================================================
+# QUIZ
+# ==================================================
+def quiz_start_offset(transcript, progress, watched_offset):
+    """
+    Offset the next quiz draws questions from: where the last one stopped,
+    or 0 (review everything watched) when too little is new
+    """
+    if new_words(transcript, progress.quiz_offset, watched_offset) >= MIN_NEW_QUIZ_WORDS:
+        return progress.quiz_offset
+    return 0
+
+
+def advance_quiz(progress, watched_offset):
+    StudyProgress.objects.filter(pk=progress.pk, quiz_offset__lt=watched_offset).update(
+        quiz_offset=watched_offset, updated_at=timezone.now(),
+    )
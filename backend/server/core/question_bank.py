@@ -0,0 +1,276 @@
+"""
+Pre-generated quiz questions per lecture.
+
+The chunks split_transcript produces for a lecture never change, so
+questions are generated once per (chunk, style), validated and stored as
+QuizQuestion rows. A quiz request then only samples rows whose chunk
+lies inside the watched range; the LLM runs in the background.
+
+Builds are small and paced so they never take over the shared LLM rate
+limits: transcription only banks basic questions for the opening chunks,
+and the rest is added a few calls at a time as students' watched ranges
+run short of questions (request_top_up).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import Random, RowNumber
+
+from .models import QuizQuestion
+from .utils.llm_gateway import PRIORITY_BACKGROUND
+from .utils.quiz_generator import (
+    PROMPTS_BY_STYLE,
+    build_quiz_prompt,
+    call_llm,
+    parse_questions,
+    split_transcript_with_offsets,
+)
+from .utils.similarity import NearDuplicateIndex
+from .utils.transcript_store import load_transcript
+
+# Banked questions a watched range should hold per style group (first
+# attempt vs retakes) before a top-up is requested: two quizzes' worth
+DEFAULT_MIN_QUESTIONS = 12
+
+# LLM calls per background build, and how fast they go out
+DEFAULT_INITIAL_CALLS = 8
+DEFAULT_TOP_UP_CALLS = 12
+DEFAULT_CALLS_PER_MINUTE = 10
+
+
+def styles_for(attempt):
+    """
+    Styles a quiz draws from: "basic" on the first attempt, the others on retakes
+    """
+    if attempt == 0:
+        return ["basic"]
+    return [style for style in PROMPTS_BY_STYLE if style != "basic"]
+
+
+def chunks_in_range(chunks, from_offset=0, upto_offset=None):
+    """
+    Indices of the chunks ending within (from_offset, upto_offset]
+    """
+    return [
+        index for index, (_, end) in enumerate(chunks)
+        if end > from_offset and (upto_offset is None or end <= upto_offset)
+    ]
+
+
+# ==================================================
+# BUILD
+# ==================================================
+def _pending_tasks(indices, styles, done):
+    """
+    (chunk_index, style) pairs still missing, style by style in timeline
+    order so every part of the range gets questions early
+    """
+    return [
+        (index, style)
+        for style in styles
+        for index in indices
+        if (index, style) not in done
+    ]
+
+
+def build_question_bank(video_id, llm=None, concurrency=None, from_offset=0, upto_offset=None, styles=None,
+                        max_calls=None, calls_per_minute=None):
+    """
+    Generate questions for every (chunk, style) pair of the lecture that
+    has none yet, limited to chunks ending within (from_offset,
+    upto_offset] and to `styles` when given. `max_calls` caps the LLM
+    calls (earliest pairs first) and `calls_per_minute` spaces them out.
+    Returns the number of questions added.
+    """
+    transcript = load_transcript(video_id)
+    if transcript is None:
+        return 0
+
+    # Bank builds yield to interactive LLM traffic
+    llm = llm or partial(call_llm, priority=PRIORITY_BACKGROUND)
+    concurrency = concurrency or getattr(settings, "QUIZ_LLM_CONCURRENCY", 4)
+    styles = styles or list(PROMPTS_BY_STYLE)
+
+    chunks = split_transcript_with_offsets(transcript.full_text)
+    existing = list(
+        QuizQuestion.objects.filter(video_id=video_id).values_list("chunk_index", "style", "question")
+    )
+    used_questions = NearDuplicateIndex.from_texts(q for _, _, q in existing)
+    tasks = _pending_tasks(
+        chunks_in_range(chunks, from_offset, upto_offset),
+        styles,
+        {(index, style) for index, style, _ in existing},
+    )[:max_calls]
+
+    interval = 60.0 / calls_per_minute if calls_per_minute else 0.0
+    pacer = {"next": time.monotonic()}
+    pacer_lock = threading.Lock()
+
+    def ask(task):
+        index, style = task
+        with pacer_lock:
+            slot = max(pacer["next"], time.monotonic())
+            pacer["next"] = slot + interval
+        time.sleep(max(0.0, slot - time.monotonic()))
+        try:
+            return task, parse_questions(llm(build_quiz_prompt(PROMPTS_BY_STYLE[style], chunks[index][0])))
+        except Exception as e:
+            print("QUIZ BANK ERROR:", e)
+            return task, []
+
+    added = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while tasks:
+            batch, tasks = tasks[:concurrency * 4], tasks[concurrency * 4:]
+            created = []
+
+            for (index, style), questions in pool.map(ask, batch):
+                for q in questions:
+                    if not used_questions.add(q["question"]):
+                        continue
+
+                    created.append(QuizQuestion(
+                        video_id=video_id,
+                        chunk_index=index,
+                        chunk_end_offset=chunks[index][1],
+                        style=style,
+                        question=q["question"],
+                        options=q["options"],
+                        correct_index=q["correct_index"],
+                        explanation=q["explanation"],
+                    ))
+
+            # Saved batch by batch: quizzes can use a long build's first chunks
+            QuizQuestion.objects.bulk_create(created)
+            added += len(created)
+
+    print(f"✅ Question bank {video_id}: +{added} ({len(existing) + added} total)")
+
+    return added
+
+
+# ==================================================
+# SAMPLE
+# ==================================================
+def banked_questions(video_id, watched_offset, from_offset=0):
+    """
+    Questions whose chunk ends within (from_offset, watched_offset]
+    """
+    return QuizQuestion.objects.filter(
+        video_id=video_id,
+        chunk_end_offset__gt=from_offset,
+        chunk_end_offset__lte=watched_offset,
+    )
+
+
+def sample_quiz(video_id, watched_offset, attempt=0, max_questions=6, from_offset=0):
+    """
+    Quiz from banked questions whose chunk ends within
+    (from_offset, watched_offset], spread over distinct chunks, then the
+    attempt's styles first, least-served first, random among equals.
+    Ranked and sampled in SQL. Returns None if the bank can't fill the
+    quiz yet.
+    """
+    # First attempt gets the beginner-friendly "basic" questions, retakes the other styles
+    other_style = Case(
+        When(Q(style__in=styles_for(attempt)), then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    preference = [F("other_style").asc(), F("times_served").asc(), Random()]
+
+    picked = list(
+        banked_questions(video_id, watched_offset, from_offset=from_offset)
+        .annotate(other_style=other_style)
+        .annotate(rank_in_chunk=Window(RowNumber(), partition_by=[F("chunk_index")], order_by=preference))
+        .order_by("rank_in_chunk", *preference)[:max_questions]
+    )
+    if len(picked) < max_questions:
+        return None
+
+    QuizQuestion.objects.filter(pk__in=[q.pk for q in picked]).update(
+        times_served=F("times_served") + 1
+    )
+
+    random.shuffle(picked)
+    return [q.as_dict() for q in picked]
+
+
+# ==================================================
+# BACKGROUND TOP-UP
+# ==================================================
+_top_up_executor = None
+_top_up_pending = set()
+_top_up_lock = threading.Lock()
+
+
+def bank_size(video_id):
+    return QuizQuestion.objects.filter(video_id=video_id).count()
+
+
+def build_initial_bank(video_id):
+    """
+    Starter bank right after transcription: basic questions for the first
+    QUIZ_BANK_INITIAL_CALLS chunks, enough for a first quiz early on
+    """
+    return build_question_bank(
+        video_id,
+        styles=styles_for(0),
+        max_calls=getattr(settings, "QUIZ_BANK_INITIAL_CALLS", DEFAULT_INITIAL_CALLS),
+        calls_per_minute=getattr(settings, "QUIZ_BANK_CALLS_PER_MINUTE", DEFAULT_CALLS_PER_MINUTE),
+    )
+
+
+def _top_up(video_id, from_offset, watched_offset, styles):
+    try:
+        build_question_bank(
+            video_id,
+            from_offset=from_offset,
+            upto_offset=watched_offset,
+            styles=styles,
+            max_calls=getattr(settings, "QUIZ_BANK_TOP_UP_CALLS", DEFAULT_TOP_UP_CALLS),
+            calls_per_minute=getattr(settings, "QUIZ_BANK_CALLS_PER_MINUTE", DEFAULT_CALLS_PER_MINUTE),
+        )
+    except Exception as e:
+        print(f"❌ Question bank {video_id} failed: {e}")
+    finally:
+        with _top_up_lock:
+            _top_up_pending.discard(video_id)
+        close_old_connections()
+
+
+def request_top_up(video_id, watched_offset, attempt=0, from_offset=0):
+    """
+    Fill in the bank for a student's watched range in a background thread
+    if it holds fewer than QUIZ_BANK_MIN_QUESTIONS questions in the styles
+    the attempt uses. At most one top-up per lecture runs at a time, and
+    it makes at most QUIZ_BANK_TOP_UP_CALLS calls.
+    """
+    global _top_up_executor
+
+    if not getattr(settings, "QUIZ_BANK_TOP_UP", True):
+        return False
+
+    styles = styles_for(attempt)
+    banked = banked_questions(video_id, watched_offset, from_offset=from_offset).filter(style__in=styles)
+    if banked.count() >= getattr(settings, "QUIZ_BANK_MIN_QUESTIONS", DEFAULT_MIN_QUESTIONS):
+        return False
+
+    with _top_up_lock:
+        if video_id in _top_up_pending:
+            return False
+        _top_up_pending.add(video_id)
+
+        if _top_up_executor is None:
+            _top_up_executor = ThreadPoolExecutor(max_workers=1)
+
+    _top_up_executor.submit(_top_up, video_id, from_offset, watched_offset, styles)
+    return True
@@ -2,17 +2,39 @@ from django.urls import path
 from .views import (
     get_lectures,
     submit_video,
+    get_job_status,
     get_transcript,
     generate_quiz_view,
     generate_notes_view,
+    generate_notes_stream_view,
     chatbot_view,
+    chatbot_stream_view,
+    get_cache_stats,
+    get_llm_stats,
+    emotion_view,
+    get_emotion_stats,
+    record_engagement,
+    get_engagement,
+    semantic_search_view,
+    search_view,
 )
 
 urlpatterns = [
     path("lectures/", get_lectures),
     path("submit-video/", submit_video),
+    path("jobs/<uuid:job_id>/", get_job_status),
     path("transcript/<str:video_id>/", get_transcript),
     path("generate-quiz/", generate_quiz_view),
     path("generate-notes/", generate_notes_view),
+    path("generate-notes/stream/", generate_notes_stream_view),
     path("chatbot/", chatbot_view),
+    path("chatbot/stream/", chatbot_stream_view),
+    path("cache-stats/", get_cache_stats),
+    path("llm-stats/", get_llm_stats),
+    path("emotion/", emotion_view),
+    path("emotion/stats/", get_emotion_stats),
+    path("engagement/", record_engagement),
+    path("engagement/<str:video_id>/", get_engagement),
+    path("search/", search_view),
+    path("search/semantic/", semantic_search_view),
 ]
@@ -0,0 +1,66 @@
+"""
+ffmpeg helpers for feeding Whisper raw 16 kHz mono PCM
+"""
+
+import subprocess
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def probe_duration(audio_path):
+    """
+    Duration of an audio file in seconds (via ffprobe)
+    """
+    output = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            audio_path,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+    return float(output)
+
+
+def load_audio_window(audio_path, start, duration):
+    """
+    Decode [start, start + duration) seconds as float32 PCM in [-1, 1]
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-ss", f"{start:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-",
+    ]
+    raw = subprocess.run(command, capture_output=True, check=True).stdout
+
+    return np.frombuffer(raw, np.int16).astype(np.float32) / 32768.0
+
+
+def plan_windows(total_seconds, window_seconds, overlap_seconds):
+    """
+    Fixed-size windows covering [0, total_seconds], each overlapping the next
+    """
+    if total_seconds <= window_seconds:
+        return [(0.0, total_seconds)]
+
+    step = window_seconds - overlap_seconds
+    windows = []
+    start = 0.0
+
+    while start < total_seconds:
+        end = min(start + window_seconds, total_seconds)
+        windows.append((start, end))
+        if end >= total_seconds:
+            break
+        start += step
+
+    return windows
@@ -1,29 +1,39 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+import re
 
-load_dotenv()
+from . import llm_gateway
+from .vocabulary import Vocabulary
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+NOT_COVERED = "This topic is not covered in the lecture."
 
 
 # ==================================================
 # 🔍 INTENT DETECTION
 # ==================================================
+SUMMARY_KEYWORDS = [
+    "summarize",
+    "summary",
+    "brief overview",
+    "explain the video",
+    "what is this lecture about",
+    "give overview",
+    "short notes",
+    "main points",
+    "key points"
+]
+
+_SUMMARY_RE = re.compile("|".join(map(re.escape, SUMMARY_KEYWORDS)), re.IGNORECASE)
+
+
 def is_summary_request(question: str) -> bool:
-    keywords = [
-        "summarize",
-        "summary",
-        "brief overview",
-        "explain the video",
-        "what is this lecture about",
-        "give overview",
-        "short notes",
-        "main points",
-        "key points"
-    ]
-    q = question.lower()
-    return any(k in q for k in keywords)
+    return _SUMMARY_RE.search(question) is not None
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical form so trivially different phrasings share a cache entry
+    """
+    q = re.sub(r"\s+", " ", question.strip().lower())
+    return q.rstrip("?!. ")
 
 
 # ==================================================
@@ -65,129 +75,252 @@ LECTURE TRANSCRIPT:
 SUMMARY (5-7 bullet points from transcript ONLY):"""
 
 
+def format_chunks(chunks):
+    """
+    Retrieved chunks in lecture order, each tagged with its time range
+    """
+    ordered = sorted(chunks, key=lambda c: c["start"])
+    return "\n\n".join(
+        f"[{format_timestamp(c['start'])} - {format_timestamp(c['end'])}] {c['text']}"
+        for c in ordered
+    )
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
 # ==================================================
 # 🔒 ENHANCED SAFETY FILTER
 # ==================================================
-def enforce_transcript_scope(answer: str, transcript: str) -> str:
+# Model already indicated not covered
+NOT_COVERED_PHRASES = [
+    "not covered in the lecture",
+    "not mentioned in the transcript",
+    "does not contain information",
+    "not discussed in this lecture",
+    "transcript does not include",
+    "not addressed in the transcript",
+    "not explicitly stated",
+    "not found in the transcript"
+]
+
+# Strong hallucination indicators (reject immediately)
+STRONG_HALLUCINATION_PHRASES = [
+    "as we all know",
+    "it is widely known",
+    "in the real world",
+    "in practice",
+    "typically in industry",
+    "best practices suggest",
+    "experts recommend",
+    "research shows",
+    "studies indicate",
+    "it is common knowledge",
+    "as everyone knows"
+]
+
+MAX_ANSWER_WORDS = 250
+
+# Answers this long must be grounded in their source text
+GROUNDING_MIN_WORDS = 30
+# Grounding score below which an answer is rejected
+GROUNDING_THRESHOLD = 0.4
+
+
+def compile_phrases(phrases):
     """
-    Strict filter to prevent hallucinations
+    One case-insensitive regex matching any of `phrases` as whole words,
+    whatever whitespace separates them
     """
-    answer = answer.strip()
-    
-    # Empty answer check
-    if not answer or len(answer) < 15:
-        return "This topic is not covered in the lecture."
-    
-    # Check if model already indicated not covered
-    not_covered_phrases = [
-        "not covered in the lecture",
-        "not mentioned in the transcript",
-        "does not contain information",
-        "not discussed in this lecture",
-        "transcript does not include",
-        "not addressed in the transcript",
-        "not explicitly stated",
-        "not found in the transcript"
-    ]
-    
-    answer_lower = answer.lower()
-    for phrase in not_covered_phrases:
-        if phrase in answer_lower:
-            return "This topic is not covered in the lecture."
-    
-    # Strong hallucination indicators (reject immediately)
-    strong_hallucination_phrases = [
-        "as we all know",
-        "it is widely known",
-        "in the real world",
-        "in practice",
-        "typically in industry",
-        "best practices suggest",
-        "experts recommend",
-        "research shows",
-        "studies indicate",
-        "it is common knowledge",
-        "as everyone knows"
+    alternatives = [
+        r"\b" + r"\s+".join(map(re.escape, phrase.split())) + r"\b"
+        for phrase in sorted(phrases, key=len, reverse=True)
     ]
-    
-    for phrase in strong_hallucination_phrases:
-        if phrase in answer_lower:
-            return "This topic is not covered in the lecture."
-    
-    # Check for excessive length (likely hallucinating)
-    word_count = len(answer.split())
-    if word_count > 250:
-        return "This topic is not covered in the lecture."
-    
-    # Verify some overlap with transcript (basic relevance check)
-    # Extract key words from transcript
-    transcript_words = set(transcript.lower().split())
-    answer_words = set(answer_lower.split())
-    
-    # Remove common stop words
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'this', 'that', 'these', 'those'}
-    transcript_words -= stop_words
-    answer_words -= stop_words
-    
-    # Check overlap
-    if len(transcript_words) > 20:  # Only check if transcript is substantial
-        overlap = len(transcript_words.intersection(answer_words))
-        overlap_ratio = overlap / min(len(answer_words), 20) if len(answer_words) > 0 else 0
-        
-        # If less than 20% word overlap, likely hallucinating
-        if overlap_ratio < 0.2 and word_count > 30:
-            return "This topic is not covered in the lecture."
-    
-    return answer
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+_REJECT_RE = compile_phrases(NOT_COVERED_PHRASES + STRONG_HALLUCINATION_PHRASES)
+# Enough tail to hold a phrase (with extra whitespace) and the character before it
+_TAIL_CHARS = 2 * max(len(p) for p in NOT_COVERED_PHRASES + STRONG_HALLUCINATION_PHRASES)
+
+
+def grounding_score(answer: str, source: Vocabulary) -> float:
+    """
+    0..1: mostly the answer's own words found in the source, plus a bonus
+    for reusing its phrasing (paraphrases keep the words, not the pairs)
+    """
+    token_share, pair_share = source.coverage(answer)
+    return 0.7 * token_share + 0.3 * pair_share
+
+
+class ScopeChecker:
+    """
+    Strict filter to prevent hallucinations, fed as the answer streams in.
+
+    feed() returns False as soon as the text so far must be rejected
+    (a not-covered / hallucination phrase, or too long), so a stream can
+    be aborted early; finish() runs the checks that need the whole answer.
+
+    The answer is scored against the retrieved `chunks` the model was
+    given, else against the lecture `vocabulary` (built from `transcript`
+    if not passed in).
+    """
+
+    def __init__(self, transcript: str, chunks=None, vocabulary=None):
+        self.transcript = transcript
+        self.chunks = chunks
+        self.vocabulary = vocabulary
+        self.text = ""
+        self.rejected = False
+
+    def feed(self, delta: str) -> bool:
+        if self.rejected:
+            return False
+
+        # Only the tail can contain a phrase that this delta completed
+        tail_start = max(0, len(self.text) - _TAIL_CHARS)
+        self.text += delta
+
+        if _REJECT_RE.search(self.text, tail_start):
+            self.rejected = True
+
+        # Check for excessive length (likely hallucinating)
+        elif len(self.text.split()) > MAX_ANSWER_WORDS:
+            self.rejected = True
+
+        return not self.rejected
+
+    def source(self) -> Vocabulary:
+        if self.chunks:
+            return Vocabulary.from_text(" ".join(c["text"] for c in self.chunks))
+        if self.vocabulary is None:
+            self.vocabulary = Vocabulary.from_text(self.transcript)
+        return self.vocabulary
+
+    def finish(self) -> bool:
+        if self.rejected:
+            return False
+
+        answer = self.text.strip()
+
+        # Empty answer check
+        if not answer or len(answer) < 15:
+            return False
+
+        # Long answers must mostly use the source's words and phrasing
+        if len(answer.split()) > GROUNDING_MIN_WORDS:
+            source = self.source()
+            if len(source) > 20 and grounding_score(answer, source) < GROUNDING_THRESHOLD:
+                return False
+
+        return True
+
+
+def enforce_transcript_scope(answer: str, transcript: str, chunks=None, vocabulary=None) -> str:
+    """
+    Strict filter to prevent hallucinations
+    """
+    checker = ScopeChecker(transcript, chunks, vocabulary)
+    checker.feed(answer)
+
+    return answer.strip() if checker.finish() else NOT_COVERED
 
 
 # ==================================================
 # 🚀 MAIN FUNCTION
 # ==================================================
-def answer_from_transcript(transcript: str, question: str) -> str:
+def build_chat_request(transcript: str, question: str, chunks=None, summary=None):
     """
-    Main chatbot function with strict transcript adherence
+    (messages, params) for the completion call, or (message, None) when
+    the input can't be answered at all. `summary` overrides the keyword
+    intent check.
     """
-    
+
     # Input validation
     if not transcript or not question:
-        return "Please load a lecture and ask a question."
-    
+        return "Please load a lecture and ask a question.", None
+
     transcript = transcript.strip()
-    question = question.strip()
-    
+    question = normalize_question(question)
+
     # Minimum transcript check
     if len(transcript.split()) < 30:
-        return "The transcript is too short to answer questions."
-    
+        return "The transcript is too short to answer questions.", None
+
     # Determine intent
-    if is_summary_request(question):
+    if summary is None:
+        summary = is_summary_request(question)
+
+    if summary:
         prompt = build_summary_prompt(transcript)
         temperature = 0.1  # Very low for factual summary
         max_tokens = 500
     else:
-        prompt = build_qa_prompt(transcript, question)
+        context = format_chunks(chunks) if chunks else transcript
+        prompt = build_qa_prompt(context, question)
         temperature = 0.1  # Very low to prevent creativity
         max_tokens = 250
-    
+
+    return [{"role": "user", "content": prompt}], {
+        "model": "llama-3.1-8b-instant",
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": 0.9,  # Add top_p for more deterministic output
+    }
+
+
+def answer_from_transcript(transcript: str, question: str, chunks=None, vocabulary=None,
+                           summary=None) -> str:
+    """
+    Main chatbot function with strict transcript adherence
+
+    `chunks` are the retrieved transcript passages for the question; when
+    given, only they are sent to the model instead of the whole transcript.
+    `vocabulary` is the transcript's precomputed Vocabulary.
+    """
+    messages, params = build_chat_request(transcript, question, chunks, summary)
+    if params is None:
+        return messages
+
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=0.9  # Add top_p for more deterministic output
+        raw_answer = llm_gateway.complete(
+            messages, priority=llm_gateway.PRIORITY_INTERACTIVE, **params
         )
-        
-        raw_answer = response.choices[0].message.content.strip()
-        
+
         # Apply safety filter
-        filtered_answer = enforce_transcript_scope(raw_answer, transcript)
-        
+        filtered_answer = enforce_transcript_scope(raw_answer, transcript, chunks, vocabulary)
+
         return filtered_answer
-        
+
     except Exception as e:
         print(f"Chatbot error: {e}")
         return "Sorry, I encountered an error processing your question."
 
 
+async def stream_answer(transcript: str, question: str, chunks=None, vocabulary=None, summary=None):
+    """
+    Streaming answer_from_transcript: yields ("token", text) as the reply
+    arrives, then ("done", None), or ("abort", NOT_COVERED) as soon as the
+    scope check rejects it (the upstream call is closed at that point).
+    """
+    messages, params = build_chat_request(transcript, question, chunks, summary)
+    if params is None:
+        yield "token", messages
+        yield "done", None
+        return
+
+    checker = ScopeChecker(transcript, chunks, vocabulary)
+    tokens = llm_gateway.stream(messages, priority=llm_gateway.PRIORITY_INTERACTIVE, **params)
+
+    try:
+        async for delta in tokens:
+            if not checker.feed(delta):
+                yield "abort", NOT_COVERED
+                return
+            yield "token", delta
+    finally:
+        await tokens.aclose()
+
+    yield ("done", None) if checker.finish() else ("abort", NOT_COVERED)
@@ -0,0 +1,129 @@
+"""
+Chunked, parallel Whisper transcription for long lectures.
+
+The audio is cut into fixed windows that overlap their neighbours,
+windows are transcribed across a process pool, and the segments are
+stitched back with absolute timestamps. Each segment is kept by the
+window whose overlap midpoint it falls on, and words repeated across a
+boundary are trimmed.
+"""
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .audio import load_audio_window, plan_windows
+
+# Per-process model, loaded by the pool initializer
+_worker_model = None
+
+
+# ==================================================
+# WORKER SIDE
+# ==================================================
+def _init_chunk_worker(model_size, device):
+    global _worker_model
+    import whisper
+
+    _worker_model = whisper.load_model(model_size, device=device)
+
+
+def _transcribe_window(audio_path, start, end, options):
+    audio = load_audio_window(audio_path, start, end - start)
+    result = _worker_model.transcribe(audio, **options)
+
+    return [
+        {
+            "start": start + float(seg["start"]),
+            "end": start + float(seg["end"]),
+            "text": seg["text"],
+        }
+        for seg in result.get("segments", [])
+    ]
+
+
+# ==================================================
+# STITCHING
+# ==================================================
+def _words(text):
+    return [re.sub(r"[^a-z0-9]", "", w.lower()) for w in text.split()]
+
+
+def _trim_repeated_prefix(previous_text, text, max_words=8):
+    """
+    Drop leading words of `text` that repeat the tail of `previous_text`
+    """
+    prev_words = _words(previous_text)
+    words = text.split()
+    norm = _words(text)
+
+    for k in range(min(max_words, len(prev_words), len(norm)), 1, -1):
+        if prev_words[-k:] == norm[:k]:
+            return " " + " ".join(words[k:]) if words[k:] else ""
+
+    return text
+
+
+def stitch_segments(windows, chunk_segments):
+    """
+    Merge per-window segments (already in absolute time) into one timeline
+    """
+    stitched = []
+
+    for i, ((start, end), segments) in enumerate(zip(windows, chunk_segments)):
+        # Ownership boundaries sit in the middle of each overlap
+        lo = (start + windows[i - 1][1]) / 2 if i > 0 else float("-inf")
+        hi = (windows[i + 1][0] + end) / 2 if i + 1 < len(windows) else float("inf")
+
+        for seg in segments:
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if not lo <= midpoint < hi:
+                continue
+
+            text = seg["text"]
+            if stitched:
+                if _words(text) == _words(stitched[-1]["text"]):
+                    continue
+                text = _trim_repeated_prefix(stitched[-1]["text"], text)
+
+            if not text.strip():
+                continue
+
+            stitched.append({
+                "start": max(seg["start"], stitched[-1]["end"]) if stitched else seg["start"],
+                "end": seg["end"],
+                "text": text,
+            })
+
+    return stitched
+
+
+# ==================================================
+# MAIN FUNCTION
+# ==================================================
+def transcribe_chunked(audio_path, duration, options, model_size, device=None,
+                       workers=2, window_seconds=300, overlap_seconds=5):
+    """
+    Whisper-compatible result ({"text", "segments"}) for a long audio file
+    """
+    windows = plan_windows(duration, window_seconds, overlap_seconds)
+    print(f"🧩 Chunked transcription: {len(windows)} windows on {workers} workers")
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(windows)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_chunk_worker,
+        initargs=(model_size, device),
+    ) as pool:
+        futures = [
+            pool.submit(_transcribe_window, audio_path, start, end, options)
+            for start, end in windows
+        ]
+        chunk_segments = [future.result() for future in futures]
+
+    segments = stitch_segments(windows, chunk_segments)
+
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+    }
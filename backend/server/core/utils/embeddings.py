@@ -0,0 +1,304 @@
+"""
+Semantic embeddings of lecture passages.
+
+The retrieval chunks of a lecture (timeline-aligned groups of segments,
+the same passages the BM25 index holds) are encoded with a small local
+sentence-embedding model on CPU (sentence-transformers, optional) and
+stored L2-normalized as a float16 <video_id>.emb.npy next to the
+transcript. Queries memory-map that file and score every passage with
+a matrix-vector product, widened to float32 a block of rows at a time;
+cross-lecture search stacks all lectures into one float16 matrix.
+"""
+
+import io
+import json
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .retrieval import get_retrieval_index
+from .transcript_store import artifact_path, atomic_write_bytes, atomic_write_text
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Questions that mean "summarize the lecture"; matched by meaning, not keywords
+SUMMARY_EXEMPLARS = [
+    "summarize the lecture",
+    "give me a brief overview of this video",
+    "what is this lecture about",
+    "what are the main points",
+    "explain the whole video in short",
+]
+DEFAULT_SUMMARY_THRESHOLD = 0.6
+
+# Rows widened to float32 at once when scoring (~1.5 MB at 384 dims)
+SCORE_BLOCK_ROWS = 1024
+
+
+class EmbeddingModelUnavailable(RuntimeError):
+    pass
+
+
+# ==================================================
+# ENCODER
+# ==================================================
+class SentenceTransformerEncoder:
+    """
+    encode(texts) -> float32 (n, dim) array of unit vectors
+    """
+
+    def __init__(self, model_name):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise EmbeddingModelUnavailable("sentence-transformers is not installed") from e
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts):
+        vectors = self.model.encode(
+            list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32)
+
+
+_encoder = None
+_encoder_error = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """
+    The shared encoder, loaded on first use; raises EmbeddingModelUnavailable
+    """
+    global _encoder, _encoder_error
+
+    if _encoder is not None:
+        return _encoder
+
+    with _encoder_lock:
+        if _encoder is None and _encoder_error is None:
+            try:
+                _encoder = SentenceTransformerEncoder(getattr(settings, "EMBEDDING_MODEL", DEFAULT_MODEL))
+                print("✅ Embedding model loaded:", _encoder.name)
+            except EmbeddingModelUnavailable as e:
+                # Don't retry the import on every request
+                _encoder_error = e
+            except Exception as e:
+                # Nor a model that failed to download or load (OSError, bad cache...)
+                print("❌ Embedding model failed to load:", e)
+                _encoder_error = EmbeddingModelUnavailable(f"Could not load embedding model: {e}")
+
+    if _encoder is None:
+        raise _encoder_error
+    return _encoder
+
+
+def embeddings_available():
+    try:
+        get_encoder()
+        return True
+    except EmbeddingModelUnavailable:
+        return False
+
+
+# ==================================================
+# PER-LECTURE VECTORS
+# ==================================================
+def vectors_path(video_id):
+    return artifact_path(video_id, ".emb.npy")
+
+
+def meta_path(video_id):
+    return artifact_path(video_id, ".emb.json")
+
+
+def _load_vectors(transcript, encoder, n_chunks):
+    """
+    Memory-mapped vectors, or None if missing or built from another
+    transcript version / model
+    """
+    try:
+        meta = json.loads(meta_path(transcript.video_id).read_text(encoding="utf-8"))
+        if meta.get("transcript_mtime") != transcript.mtime or meta.get("model") != encoder.name:
+            return None
+        vectors = np.load(vectors_path(transcript.video_id), mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+
+    return vectors if vectors.shape[0] == n_chunks else None
+
+
+def get_lecture_vectors(transcript):
+    """
+    (chunks, float16 unit vectors) for a Transcript: in memory, else
+    memory-mapped from disk, else encoded + saved
+    """
+    cached = transcript.derived.get("embeddings")
+    if cached is not None:
+        return cached
+
+    encoder = get_encoder()
+    chunks = get_retrieval_index(transcript).chunks
+    if not chunks:
+        return [], np.zeros((0, 0), dtype=np.float16)
+
+    vectors = _load_vectors(transcript, encoder, len(chunks))
+
+    if vectors is None:
+        vectors = encoder.encode([c["text"] for c in chunks]).astype(np.float16)
+
+        buf = io.BytesIO()
+        np.save(buf, vectors)
+        atomic_write_bytes(vectors_path(transcript.video_id), buf.getvalue())
+        atomic_write_text(meta_path(transcript.video_id), json.dumps({
+            "transcript_mtime": transcript.mtime,
+            "model": encoder.name,
+        }))
+
+    transcript.derived["embeddings"] = (chunks, vectors)
+    return chunks, vectors
+
+
+def top_k(scores, k):
+    """
+    Indices of the k highest scores, best first
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def encode_query(text):
+    return get_encoder().encode([text])[0]
+
+
+def score_vectors(vectors, query, block_rows=SCORE_BLOCK_ROWS):
+    """
+    float32 dot products of float16 `vectors` (array or memmap) with
+    `query`, without a float32 copy of the whole matrix
+    """
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        block = vectors[start:start + block_rows]
+        np.dot(block.astype(np.float32), query, out=scores[start:start + len(block)])
+    return scores
+
+
+def semantic_search(transcript, query, k=4):
+    """
+    Top-k chunks of one lecture by cosine similarity, as dicts with "score"
+    """
+    chunks, vectors = get_lecture_vectors(transcript)
+    if not chunks:
+        return []
+
+    scores = score_vectors(vectors, encode_query(query))
+    return [dict(chunks[i], score=round(float(scores[i]), 4)) for i in top_k(scores, k)]
+
+
+# ==================================================
+# HYBRID CONTEXT SELECTION
+# ==================================================
+RRF_K = 60
+
+
+def hybrid_search(transcript, query, k=None):
+    """
+    BM25 and semantic rankings merged by reciprocal rank fusion: exact
+    terms and paraphrased questions both find their passage. Falls back
+    to BM25 alone when no embedding model is installed.
+    """
+    k = k or getattr(settings, "RETRIEVAL_TOP_K", 4)
+    keyword_hits = get_retrieval_index(transcript).search(query, k=k * 2)
+    if not embeddings_available():
+        return keyword_hits[:k]
+
+    fused = {}
+    for ranking in (keyword_hits, semantic_search(transcript, query, k=k * 2)):
+        for rank, chunk in enumerate(ranking):
+            key = (chunk["start"], chunk["end"])
+            entry = fused.setdefault(key, {"chunk": chunk, "score": 0.0})
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+
+    best = sorted(fused.values(), key=lambda e: -e["score"])[:k]
+    return [dict(e["chunk"], score=round(e["score"], 6)) for e in best]
+
+
+_summary_vectors = {}
+
+
+def is_summary_intent(question):
+    """
+    True if `question` is close in meaning to a summary request; None when
+    no embedding model is installed (callers fall back to keywords)
+    """
+    if not embeddings_available():
+        return None
+
+    encoder = get_encoder()
+    if encoder.name not in _summary_vectors:
+        _summary_vectors[encoder.name] = encoder.encode(SUMMARY_EXEMPLARS)
+
+    threshold = getattr(settings, "EMBEDDING_SUMMARY_THRESHOLD", DEFAULT_SUMMARY_THRESHOLD)
+    return float((_summary_vectors[encoder.name] @ encode_query(question)).max()) >= threshold
+
+
+# ==================================================
+# CROSS-LECTURE SEARCH
+# ==================================================
+_corpus = {"key": None}
+_corpus_lock = threading.Lock()
+
+
+def corpus_matrix(transcripts):
+    """
+    (float16 matrix of every lecture's vectors, [(video_id, chunk)] rows),
+    rebuilt only when a lecture is added or re-transcribed
+    """
+    key = tuple((t.video_id, t.mtime) for t in transcripts)
+
+    with _corpus_lock:
+        if _corpus["key"] == key:
+            return _corpus["matrix"], _corpus["rows"]
+
+    blocks, rows = [], []
+    for transcript in transcripts:
+        chunks, vectors = get_lecture_vectors(transcript)
+        if chunks:
+            blocks.append(vectors)
+            rows.extend((transcript.video_id, chunk) for chunk in chunks)
+
+    matrix = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float16)
+
+    with _corpus_lock:
+        _corpus.update(key=key, matrix=matrix, rows=rows)
+    return matrix, rows
+
+
+def search_lectures(transcripts, query, k=10):
+    """
+    Best passages across lectures: [{"video_id", "start", "end", "text", "score"}]
+    """
+    matrix, rows = corpus_matrix(transcripts)
+    if not rows:
+        return []
+
+    scores = score_vectors(matrix, encode_query(query))
+    results = []
+    for i in top_k(scores, k):
+        video_id, chunk = rows[i]
+        results.append({
+            "video_id": video_id,
+            "start": chunk["start"],
+            "end": chunk["end"],
+            "text": chunk["text"],
+            "score": round(float(scores[i]), 4),
+        })
+    return results
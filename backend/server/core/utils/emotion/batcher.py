@@ -0,0 +1,157 @@
+"""
+Micro-batching for emotion inference.
+
+Requests from many students each submit one face; a single worker thread
+collects faces until it has `max_batch` of them or the oldest has waited
+`max_wait_ms`, then classifies them all in one forward pass. Per-call
+overhead is paid once per batch instead of once per face.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+STATS_WINDOW = 500
+
+
+class BatcherBusy(RuntimeError):
+    """
+    A face was not classified within its timeout (the batcher is overloaded)
+    """
+
+
+class MicroBatcher:
+
+    def __init__(self, infer, max_batch=32, max_wait_ms=10):
+        """
+        `infer` maps a float32 (N, H, W, C) batch to (N, classes) scores
+        """
+        self.infer = infer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._latencies = deque(maxlen=STATS_WINDOW)
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="emotion-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """
+        Queue one (H, W, C) input; the Future resolves to its score row
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def classify(self, item, timeout=None):
+        """
+        Score row for one input. On timeout the queued face is cancelled,
+        so the worker skips it instead of running the model on a frame
+        nobody waits for, and BatcherBusy is raised.
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise BatcherBusy(f"no result within {timeout}s") from None
+
+    # ---------------- worker ----------------
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip faces whose request gave up while queued
+            live = [(item, f) for item, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            items, futures = zip(*live)
+
+            t0 = time.perf_counter()
+            try:
+                scores = self.infer(np.stack(items).astype(np.float32, copy=False))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            latency = time.perf_counter() - t0
+
+            for future, row in zip(futures, scores):
+                future.set_result(row)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(items)
+                self.busy_seconds += latency
+                self._batch_sizes.append(len(items))
+                self._latencies.append(latency)
+
+    # ---------------- stats ----------------
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            pick = lambda pct: round(latencies[min(len(latencies) - 1, int(pct * len(latencies)))] * 1000, 2)
+
+            return {
+                "batches": self.batches,
+                "faces": self.items,
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_batch_size": round(sum(self._batch_sizes) / len(self._batch_sizes), 2) if self._batch_sizes else 0.0,
+                "batch_latency_p50_ms": pick(0.5) if latencies else None,
+                "batch_latency_p95_ms": pick(0.95) if latencies else None,
+                # Faces per second of model time
+                "throughput_fps": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            }
+
+
+# ==================================================
+# SHARED INSTANCE
+# ==================================================
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+
+    with _batcher_lock:
+        if _batcher is None:
+            from .model_loader import get_model
+
+            # Load (or fail) here, not on the worker thread
+            _batcher = MicroBatcher(
+                get_model(),
+                max_batch=getattr(settings, "EMOTION_MAX_BATCH", 32),
+                max_wait_ms=getattr(settings, "EMOTION_MAX_WAIT_MS", 10),
+            )
+
+    return _batcher
+
+
+def batcher_stats():
+    return _batcher.stats() if _batcher is not None else None
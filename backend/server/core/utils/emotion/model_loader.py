@@ -1,5 +1,9 @@
-import tensorflow as tf
 import os
+import threading
+
+from django.conf import settings
+
+import numpy as np
 
 MODEL_PATHS = [
     "checkpoints/mobilenet_aug/Epoch_500_model.hp5",
@@ -7,13 +11,91 @@ MODEL_PATHS = [
     "checkpoints/Epoch_90_model.hp5",
 ]
 
-model = None
+INPUT_SIZE = 224
+
+
+class EmotionModelUnavailable(RuntimeError):
+    pass
+
+
+# ==================================================
+# BACKENDS
+# ==================================================
+class KerasBackend:
+    """
+    Direct model(x, training=False) call: skips the per-call setup that
+    model.predict does (callbacks, tf.data pipeline, progress handling)
+    """
+
+    def __init__(self, path):
+        import tensorflow as tf
+
+        self.path = path
+        self.model = tf.keras.models.load_model(path, compile=False)
+
+    def __call__(self, batch):
+        return np.asarray(self.model(batch, training=False))
+
+
+class TFLiteBackend:
+    """
+    Exported TFLite model on CPU (see `manage.py export_emotion_model`).
+    Not thread-safe: only the batcher's worker thread calls it.
+    """
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = None
+
+    def __call__(self, batch):
+        if batch.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = batch.shape[0]
+
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+# ==================================================
+# LAZY LOADING
+# ==================================================
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_model():
+    tflite_path = getattr(settings, "EMOTION_TFLITE_PATH", None)
+    if tflite_path and os.path.exists(tflite_path):
+        print("✅ Emotion model loaded (TFLite):", tflite_path)
+        return TFLiteBackend(tflite_path, num_threads=getattr(settings, "EMOTION_NUM_THREADS", None))
+
+    for path in MODEL_PATHS:
+        if os.path.exists(path):
+            print("✅ Emotion model loaded:", path)
+            return KerasBackend(path)
+
+    raise EmotionModelUnavailable("❌ Emotion model not found")
+
+
+def get_model():
+    """
+    Shared emotion model: callable on a float32 (N, 224, 224, 3) RGB batch,
+    returning (N, len(LABELS)) class probabilities. Loaded on first use.
+    """
+    global _model
 
-for path in MODEL_PATHS:
-    if os.path.exists(path):
-        model = tf.keras.models.load_model(path, compile=False)
-        print("✅ Emotion model loaded:", path)
-        break
+    with _model_lock:
+        if _model is None:
+            _model = load_model()
 
-if model is None:
-    raise RuntimeError("❌ Emotion model not found")
+    return _model
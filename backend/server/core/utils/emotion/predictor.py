@@ -1,32 +1,101 @@
+import os
+
 import cv2
 import numpy as np
-from .model_loader import model
+from django.conf import settings
+
+from .batcher import get_batcher
+from .model_loader import INPUT_SIZE, get_model
+from .tracker import get_tracker
 
 LABELS = ["Bored", "Engaged", "Confused", "Frustrated"]
 
+NO_FACE = {"emotion": "No Face", "confidence": 0.0}
+
 face_cascade = cv2.CascadeClassifier(
-    "core/utils/emotion/haarcascade_frontalface_default.xml"
+    os.path.join(os.path.dirname(__file__), "haarcascade_frontalface_default.xml")
 )
 
-def predict_emotion(image_bgr):
+
+def detect_faces(gray, min_size=None, max_size=None):
+    # Tracker crops / strided downscales are views; OpenCV wants contiguous rows
+    return face_cascade.detectMultiScale(
+        np.ascontiguousarray(gray), 1.1, 4,
+        minSize=min_size or (0, 0), maxSize=max_size or (0, 0)
+    )
+
+
+def extract_face(image_bgr, tracker=None):
+    """
+    Largest detected face as a (224, 224, 3) RGB array, or None.
+    With a FaceTracker, the previous frame's box narrows the search.
+    """
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
 
-    if len(faces) == 0:
-        return {"emotion": "No Face", "confidence": 0.0}
+    if tracker is not None:
+        box = tracker.locate(gray)
+        if box is None:
+            return None
+        x, y, w, h = box
+    else:
+        faces = detect_faces(gray)
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2]*f[3])
 
-    x, y, w, h = max(faces, key=lambda f: f[2]*f[3])
     face = image_bgr[y:y+h, x:x+w]
-    face = cv2.resize(face, (224, 224))
-    face = face[..., ::-1]
-    face = np.expand_dims(face, axis=0)
-
-    preds = model.predict(face, verbose=0)[0]
+    face = cv2.resize(face, (INPUT_SIZE, INPUT_SIZE))
+    return face[..., ::-1]
 
-    emotion = LABELS[np.argmax(preds)]
-    confidence = float(np.max(preds))
 
+def to_result(preds):
     return {
-        "emotion": emotion,
-        "confidence": confidence
+        "emotion": LABELS[int(np.argmax(preds))],
+        "confidence": float(np.max(preds))
     }
+
+
+def predict_emotion(image_bgr):
+    """
+    Single frame, classified on its own
+    """
+    face = extract_face(image_bgr)
+    if face is None:
+        return dict(NO_FACE)
+
+    batch = np.expand_dims(face, axis=0).astype(np.float32)
+    return to_result(get_model()(batch)[0])
+
+
+def predict_emotion_batched(image_bgr, session_id=None, timeout=None):
+    """
+    Single frame, classified in a shared forward pass with frames from
+    other requests (see batcher.py). Frames sent with a session_id reuse
+    that session's face track (see tracker.py).
+    """
+    tracker = None
+    if session_id:
+        tracker = get_tracker(
+            session_id,
+            detect_faces,
+            redetect_every=getattr(settings, "EMOTION_REDETECT_EVERY", 10),
+            downscale=getattr(settings, "EMOTION_DETECT_DOWNSCALE", 2),
+        )
+
+    face = extract_face(image_bgr, tracker)
+    if face is None:
+        return dict(NO_FACE)
+
+    result = to_result(get_batcher().classify(face, timeout=timeout))
+
+    if tracker is not None:
+        tracker.report_confidence(result["confidence"])
+
+    return result
+
+
+def decode_frame(data):
+    """
+    Encoded image bytes (JPEG/PNG) -> BGR array, or None
+    """
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
@@ -0,0 +1,144 @@
+"""
+Per-session face tracking for webcam streams.
+
+Consecutive frames from one student barely move, so the Haar cascade
+does not need to scan every full-resolution frame. A FaceTracker runs
+full detection on a downscaled frame, then for the next frames only
+searches a small region around the last box, at scales close to the
+last face size. Full detection runs again every `redetect_every`
+frames, when the ROI search loses the face, or when the classifier's
+confidence drops.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MAX_SESSIONS = 5000
+SESSION_TTL_SECONDS = 300
+
+
+def _largest(faces):
+    return max(faces, key=lambda f: f[2] * f[3]) if len(faces) else None
+
+
+class FaceTracker:
+
+    def __init__(self, detect, redetect_every=10, downscale=2, roi_margin=0.5,
+                 size_tolerance=0.3, min_confidence=0.4):
+        """
+        `detect(gray, min_size, max_size)` returns (x, y, w, h) face boxes
+        (sizes may be None for "any")
+        """
+        self.detect = detect
+        self.redetect_every = redetect_every
+        self.downscale = downscale
+        self.roi_margin = roi_margin
+        self.size_tolerance = size_tolerance
+        self.min_confidence = min_confidence
+
+        self.box = None
+        self.since_full = 0
+        self._lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.stats = {"frames": 0, "full_detections": 0, "roi_detections": 0, "roi_misses": 0}
+
+    def _full(self, gray):
+        d = self.downscale
+        face = _largest(self.detect(gray[::d, ::d], None, None))
+        if face is None:
+            return None
+        x, y, w, h = face
+        return (int(x) * d, int(y) * d, int(w) * d, int(h) * d)
+
+    def _roi(self, gray):
+        x, y, w, h = self.box
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+
+        side = min(w, h)
+        lo = int(side * (1 - self.size_tolerance))
+        hi = int(side * (1 + self.size_tolerance))
+
+        face = _largest(self.detect(gray[y0:y1, x0:x1], (lo, lo), (hi, hi)))
+        if face is None:
+            return None
+        fx, fy, fw, fh = face
+        return (int(fx) + x0, int(fy) + y0, int(fw), int(fh))
+
+    def locate(self, gray):
+        """
+        Face box (x, y, w, h) in `gray` (full resolution), or None
+        """
+        with self._lock:
+            return self._locate(gray)
+
+    def _locate(self, gray):
+        self.stats["frames"] += 1
+        self.last_seen = time.monotonic()
+        box = None
+
+        if self.box is not None and self.since_full < self.redetect_every:
+            box = self._roi(gray)
+            if box is not None:
+                self.stats["roi_detections"] += 1
+                self.since_full += 1
+            else:
+                self.stats["roi_misses"] += 1
+
+        if box is None:
+            box = self._full(gray)
+            self.stats["full_detections"] += 1
+            self.since_full = 0
+
+        self.box = box
+        return box
+
+    def report_confidence(self, confidence):
+        """
+        Low classifier confidence suggests a bad crop: detect fully next frame
+        """
+        if confidence < self.min_confidence:
+            self.since_full = self.redetect_every
+
+
+# ==================================================
+# SESSIONS
+# ==================================================
+_trackers = OrderedDict()
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(session_id, detect, **options):
+    """
+    The session's tracker (created on first use). Idle sessions expire
+    after SESSION_TTL_SECONDS; at most MAX_SESSIONS are kept.
+    """
+    now = time.monotonic()
+
+    with _trackers_lock:
+        tracker = _trackers.pop(session_id, None)
+        if tracker is None or now - tracker.last_seen > SESSION_TTL_SECONDS:
+            tracker = FaceTracker(detect, **options)
+        _trackers[session_id] = tracker
+
+        while len(_trackers) > MAX_SESSIONS:
+            _trackers.popitem(last=False)
+        while _trackers:
+            oldest = next(iter(_trackers.values()))
+            if now - oldest.last_seen <= SESSION_TTL_SECONDS:
+                break
+            _trackers.popitem(last=False)
+
+    return tracker
+
+
+def tracker_stats():
+    with _trackers_lock:
+        totals = {"sessions": len(_trackers), "frames": 0, "full_detections": 0,
+                  "roi_detections": 0, "roi_misses": 0}
+        for tracker in _trackers.values():
+            for key, value in tracker.stats.items():
+                totals[key] += value
+        return totals
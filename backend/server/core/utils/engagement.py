@@ -0,0 +1,247 @@
+"""
+Engagement samples (emotion over lecture time) and their aggregation.
+
+Samples are fixed-size binary records appended to one
+<video_id>.engagement.bin log per lecture, next to its transcript:
+
+    session  uint32   crc32 of the client's session id
+    t        float32  video time in seconds
+    label    uint8    index into LABELS
+    conf     uint8    classifier confidence * 255
+
+Appends are buffered in memory and written in one O_APPEND write per
+flush (at most FLUSH_RECORDS or FLUSH_SECONDS old), so ingest cost is a
+list append per sample. Aggregation reads the whole log as one NumPy
+array and bins it onto the transcript timeline with searchsorted +
+bincount.
+"""
+
+import atexit
+import math
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .transcript_store import Timeline, artifact_path
+
+LABELS = ["Bored", "Engaged", "Confused", "Frustrated", "No Face"]
+LABEL_INDEX = {label: i for i, label in enumerate(LABELS)}
+
+RECORD_DTYPE = np.dtype([
+    ("session", "<u4"),
+    ("t", "<f4"),
+    ("label", "u1"),
+    ("conf", "u1"),
+])
+
+FLUSH_RECORDS = 4096
+FLUSH_SECONDS = 1.0
+
+# Bin width for lectures without a timeline
+FALLBACK_BIN_SECONDS = 30.0
+
+
+def log_path(video_id):
+    return artifact_path(video_id, ".engagement.bin")
+
+
+def session_key(session_id):
+    return zlib.crc32(str(session_id).encode("utf-8"))
+
+
+# ==================================================
+# INGEST
+# ==================================================
+class EngagementLog:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}  # video_id -> list of record tuples
+        self._first_buffered = {}  # video_id -> time of oldest unflushed record
+        self._flusher = None
+
+    def append(self, video_id, session_id, samples):
+        """
+        Buffer (t, emotion, confidence) samples for one session.
+        Unknown emotions, negative times and NaN/infinite values are
+        dropped; returns the count kept.
+        """
+        session = session_key(session_id)
+        records = []
+        for t, emotion, conf in samples:
+            t, conf = float(t), float(conf)
+            # inf passes t >= 0 and a NaN confidence breaks int(): finite values only
+            if emotion in LABEL_INDEX and math.isfinite(t) and t >= 0 and math.isfinite(conf):
+                records.append((session, t, LABEL_INDEX[emotion], int(round(min(max(conf, 0.0), 1.0) * 255))))
+        if not records:
+            return 0
+
+        with self._lock:
+            buffer = self._buffers.setdefault(video_id, [])
+            buffer.extend(records)
+            self._first_buffered.setdefault(video_id, time.monotonic())
+            full = len(buffer) >= FLUSH_RECORDS
+            self._start_flusher()
+
+        if full:
+            self.flush(video_id)
+
+        return len(records)
+
+    def _take(self, video_id):
+        with self._lock:
+            self._first_buffered.pop(video_id, None)
+            return self._buffers.pop(video_id, [])
+
+    def flush(self, video_id=None):
+        """
+        Write buffered records (of one lecture, or all) to their logs
+        """
+        if video_id is not None:
+            video_ids = [video_id]
+        else:
+            with self._lock:
+                video_ids = list(self._buffers)
+
+        for vid in video_ids:
+            records = self._take(vid)
+            if not records:
+                continue
+
+            data = np.array(records, dtype=RECORD_DTYPE).tobytes()
+            # One write on an O_APPEND fd: whole records, even with other processes appending
+            fd = os.open(log_path(vid), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="engagement-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_SECONDS / 2)
+            now = time.monotonic()
+            with self._lock:
+                due = [vid for vid, t in self._first_buffered.items() if now - t >= FLUSH_SECONDS]
+            for vid in due:
+                try:
+                    self.flush(vid)
+                except OSError as e:
+                    print(f"❌ Engagement flush {vid} failed: {e}")
+
+
+_log = EngagementLog()
+atexit.register(_log.flush)
+
+
+def record_samples(video_id, session_id, samples):
+    return _log.append(video_id, session_id, samples)
+
+
+def flush(video_id=None):
+    _log.flush(video_id)
+
+
+# ==================================================
+# AGGREGATION
+# ==================================================
+def load_samples(video_id):
+    """
+    Every flushed sample for a lecture as a RECORD_DTYPE array
+    """
+    path = log_path(video_id)
+    if not path.exists():
+        return np.zeros(0, dtype=RECORD_DTYPE)
+
+    data = path.read_bytes()
+    # Ignore a trailing partial record (a write in progress elsewhere)
+    usable = len(data) - len(data) % RECORD_DTYPE.itemsize
+    return np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+
+
+def segment_bounds(timeline, duration=None):
+    """
+    (starts, ends) arrays to bin against: the transcript timeline, or
+    fixed-width bins when there is none
+    """
+    if isinstance(timeline, Timeline) and len(timeline):
+        # Already sorted float64 columns of the transcript file
+        return timeline.starts, timeline.ends
+
+    if timeline:
+        starts = np.array([seg["start"] for seg in timeline], dtype=np.float64)
+        ends = np.array([seg["end"] for seg in timeline], dtype=np.float64)
+        order = np.argsort(starts, kind="stable")
+        return starts[order], ends[order]
+
+    n_bins = max(1, int(np.ceil((duration or 0) / FALLBACK_BIN_SECONDS)))
+    starts = np.arange(n_bins, dtype=np.float64) * FALLBACK_BIN_SECONDS
+    return starts, starts + FALLBACK_BIN_SECONDS
+
+
+def aggregate(samples, starts, ends):
+    """
+    Per-segment label histograms and distinct-session counts.
+
+    Returns (counts[n_segments, n_labels], sessions[n_segments]); samples
+    falling in gaps between segments are ignored.
+    """
+    n_segments, n_labels = len(starts), len(LABELS)
+    if not len(samples) or not n_segments:
+        return np.zeros((n_segments, n_labels), dtype=np.int64), np.zeros(n_segments, dtype=np.int64)
+
+    t = samples["t"].astype(np.float64)
+    seg = np.searchsorted(starts, t, side="right") - 1
+    inside = (seg >= 0) & (t < ends[np.clip(seg, 0, None)])
+
+    seg = seg[inside]
+    labels = samples["label"][inside].astype(np.int64)
+    sessions = samples["session"][inside].astype(np.int64)
+
+    counts = np.bincount(seg * n_labels + labels, minlength=n_segments * n_labels)
+    counts = counts.reshape(n_segments, n_labels)
+
+    # Distinct (segment, session) pairs -> sessions per segment
+    pairs = np.unique(seg * (1 << 32) + sessions)
+    distinct = np.bincount(pairs >> 32, minlength=n_segments)
+
+    return counts, distinct
+
+
+def engagement_timeline(transcript):
+    """
+    Per-segment engagement for a Transcript, ready to serve
+    """
+    flush(transcript.video_id)
+    samples = load_samples(transcript.video_id)
+
+    duration = float(samples["t"].max()) + 1 if len(samples) else 0
+    starts, ends = segment_bounds(transcript.timeline, duration)
+    counts, sessions = aggregate(samples, starts, ends)
+
+    segments = []
+    for i in range(len(starts)):
+        row = counts[i]
+        total = int(row.sum())
+        segments.append({
+            "start": round(float(starts[i]), 2),
+            "end": round(float(ends[i]), 2),
+            "samples": total,
+            "sessions": int(sessions[i]),
+            "counts": dict(zip(LABELS, row.tolist())),
+            "dominant": LABELS[int(row.argmax())] if total else None,
+        })
+
+    return {
+        "video_id": transcript.video_id,
+        "samples": int(len(samples)),
+        "sessions": int(len(np.unique(samples["session"]))) if len(samples) else 0,
+        "segments": segments,
+    }
@@ -0,0 +1,44 @@
+"""
+Offline stand-in for the quiz LLM, used by tests and `manage.py bench_quiz`
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+
+
+class FakeQuizLLM:
+    """
+    Callable with call_llm's signature that sleeps for a log-normal
+    latency and returns one well-formed MCQ derived from the prompt.
+    `failure_rate` of calls return unparsable text.
+    """
+
+    def __init__(self, median_ms=800, sigma=0.5, failure_rate=0.0, seed=0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.calls += 1
+            latency = self.median_ms * self._rng.lognormvariate(0, self.sigma) / 1000
+            fail = self._rng.random() < self.failure_rate
+
+        time.sleep(latency)
+
+        if fail:
+            return "Sorry, I cannot help with that."
+
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:10]
+        return json.dumps([{
+            "question": f"Question {digest}: what does the text describe?",
+            "options": ["A", "B", "C", "D"],
+            "correct_index": 0,
+            "explanation": "The text states it directly.",
+        }])
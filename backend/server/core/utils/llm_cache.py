@@ -0,0 +1,186 @@
+"""
+Response cache in front of chat completion calls (used by llm_gateway).
+
+Keys are a hash of the model, the messages and the sampling parameters,
+so identical prompts (the same full-lecture notes, a question many
+students ask) hit Groq once. Entries live in a small SQLite file with a
+TTL and a total-size cap (least recently used rows go first).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class LLMCache:
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = str(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+            db.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)")
+
+            # Running totals kept by triggers, so writes never scan the table
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+            """)
+            db.execute("""
+                INSERT OR IGNORE INTO llm_cache_totals (id, entries, bytes)
+                SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache
+            """)
+            db.executescript("""
+                CREATE TRIGGER IF NOT EXISTS llm_cache_insert AFTER INSERT ON llm_cache BEGIN
+                    UPDATE llm_cache_totals SET entries = entries + 1, bytes = bytes + new.size;
+                END;
+                CREATE TRIGGER IF NOT EXISTS llm_cache_delete AFTER DELETE ON llm_cache BEGIN
+                    UPDATE llm_cache_totals SET entries = entries - 1, bytes = bytes - old.size;
+                END;
+                CREATE TRIGGER IF NOT EXISTS llm_cache_update AFTER UPDATE OF size ON llm_cache BEGIN
+                    UPDATE llm_cache_totals SET bytes = bytes + new.size - old.size;
+                END;
+            """)
+
+    def _connect(self):
+        # sqlite3 connections are per thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def make_key(**params):
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        db = self._connect()
+        row = db.execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or row[1] < now:
+            if row is not None:
+                with db:
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count(hit=False)
+            return None
+
+        with db:
+            db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._count(hit=True)
+        return row[0]
+
+    def set(self, key, value, ttl_seconds=None):
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        size = len(value.encode("utf-8"))
+        db = self._connect()
+
+        with db:
+            # Upsert, not INSERT OR REPLACE: REPLACE's implicit delete skips triggers
+            db.execute(
+                "INSERT INTO llm_cache (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (key, value, size, now + ttl, now),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+
+        total = db.execute("SELECT bytes FROM llm_cache_totals").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used rows until back under the cap
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_access"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        db.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+
+    def stats(self):
+        entries, total = self._connect().execute(
+            "SELECT entries, bytes FROM llm_cache_totals"
+        ).fetchone()
+
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ==================================================
+# SHARED INSTANCE
+# ==================================================
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(
+                settings.LLM_CACHE_PATH,
+                ttl_seconds=getattr(settings, "LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+                max_bytes=getattr(settings, "LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            )
+
+    return _cache
+
+
+def cache_stats():
+    return get_cache().stats()
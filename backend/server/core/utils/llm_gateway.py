@@ -0,0 +1,748 @@
+"""
+Single entry point for every LLM call (chatbot, notes, quiz, question bank).
+
+The gateway owns one pooled Groq client (plus an async one for
+streaming), the response cache, and a scheduler that keeps calls under
+the provider's requests- and tokens-per-minute limits. Waiting calls are
+admitted by priority class, so a student's chat question goes ahead of a
+background question-bank build. Rate-limit, server and connection errors
+are retried with jittered exponential backoff, honouring Retry-After.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from dotenv import load_dotenv
+from groq import (
+    APIConnectionError,
+    AsyncGroq,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    Groq,
+    InternalServerError,
+    RateLimitError,
+)
+
+from .llm_cache import LLMCache, get_cache
+
+load_dotenv()
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+# Priority classes: lower is admitted first
+PRIORITY_INTERACTIVE = 0   # chatbot, streamed replies
+PRIORITY_NORMAL = 1        # notes, live quiz generation
+PRIORITY_BACKGROUND = 2    # question bank builds
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background",
+}
+
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+LATENCY_WINDOW = 500
+# How often a waiting stream re-checks whether it is next in line
+ASYNC_POLL_SECONDS = 0.05
+# Shared limits: how often a listed waiter re-checks (and refreshes its
+# row), and how long a row may go unrefreshed before it is ignored
+SHARED_POLL_SECONDS = 0.25
+SHARED_WAITER_TTL = 5.0
+
+
+class LLMQueueTimeout(Exception):
+    """
+    A call waited longer than its queue timeout for rate-limit capacity
+    """
+
+
+# ==================================================
+# SCHEDULING
+# ==================================================
+class TokenBucket:
+    """
+    `per_minute` units refilled continuously, bursting up to one minute's worth
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until `amount` units are available (0 if they are now)
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount):
+        # Settle an estimate against actual usage (negative = charge more)
+        self.level = min(self.capacity, self.level + amount)
+
+
+def take_capacity(tokens, requests, paused_until, cost, now):
+    """
+    Seconds until a call costing `cost` tokens may go out; 0 means it may,
+    and one request plus `cost` tokens have been taken
+    """
+    wait = max(paused_until - now, tokens.wait_time(cost, now), requests.wait_time(1, now))
+    if wait <= 0:
+        tokens.take(cost)
+        requests.take(1)
+    return wait
+
+
+class LocalLimits:
+    """
+    Buckets held in this process only
+    """
+
+    def __init__(self, tokens_per_minute, requests_per_minute):
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self.paused_until = 0.0
+
+    def try_take(self, cost, waiter):
+        # Priority order within the process is the Scheduler's heap
+        return take_capacity(self.tokens, self.requests, self.paused_until, cost, time.monotonic())
+
+    def leave(self, waiter):
+        pass
+
+    def give(self, amount, requests=0):
+        self.tokens.give(amount)
+        self.requests.give(requests)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def levels(self):
+        now = time.monotonic()
+        self.tokens.wait_time(0, now)
+        self.requests.wait_time(0, now)
+        return self.tokens.level, self.requests.level
+
+
+class SharedLimits:
+    """
+    The same buckets kept in a SQLite file, so every process on the host
+    (web workers, the transcription pool, bank builds) draws on one budget.
+
+    Each process's next-in-line call is listed in llm_waiters with its
+    priority and is only admitted while no process has a more urgent call
+    waiting, so background work elsewhere cannot take capacity ahead of a
+    chat reply. Listed waiters re-check every SHARED_POLL_SECONDS; a row not
+    refreshed for SHARED_WAITER_TTL (crashed process) is ignored.
+    Times are wall-clock, as monotonic clocks differ between processes.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_limits (
+        name TEXT PRIMARY KEY,
+        level REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS llm_waiters (
+        id TEXT PRIMARY KEY,
+        priority INTEGER NOT NULL,
+        seen REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path, tokens_per_minute, requests_per_minute):
+        self.path = str(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self._local = threading.local()
+
+        now = time.time()
+        self._transaction(lambda db: db.executemany(
+            "INSERT OR IGNORE INTO llm_limits (name, level, updated) VALUES (?, ?, ?)",
+            [("tokens", tokens_per_minute, now), ("requests", requests_per_minute, now),
+             ("paused_until", 0.0, now)],
+        ))
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+        return conn
+
+    def _transaction(self, body):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = body(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _load(self, db):
+        rows = {name: (level, updated) for name, level, updated in
+                db.execute("SELECT name, level, updated FROM llm_limits")}
+        tokens = TokenBucket(self.tokens_per_minute)
+        requests = TokenBucket(self.requests_per_minute)
+        tokens.level, tokens.updated = rows["tokens"]
+        requests.level, requests.updated = rows["requests"]
+        return tokens, requests, rows["paused_until"][0]
+
+    def _save(self, db, tokens, requests):
+        db.executemany(
+            "UPDATE llm_limits SET level = ?, updated = ? WHERE name = ?",
+            [(tokens.level, tokens.updated, "tokens"), (requests.level, requests.updated, "requests")],
+        )
+
+    @staticmethod
+    def waiter_id(waiter):
+        return f"{os.getpid()}:{waiter[1]}"
+
+    def try_take(self, cost, waiter):
+        priority, waiter_id = waiter[0], self.waiter_id(waiter)
+
+        def body(db):
+            now = time.time()
+            db.execute("DELETE FROM llm_waiters WHERE seen < ?", (now - SHARED_WAITER_TTL,))
+            ahead = db.execute(
+                "SELECT 1 FROM llm_waiters WHERE priority < ? AND id != ? LIMIT 1", (priority, waiter_id)
+            ).fetchone()
+
+            wait = SHARED_POLL_SECONDS
+            if ahead is None:
+                tokens, requests, paused_until = self._load(db)
+                wait = take_capacity(tokens, requests, paused_until, cost, now)
+                self._save(db, tokens, requests)
+
+            if wait <= 0:
+                db.execute("DELETE FROM llm_waiters WHERE id = ?", (waiter_id,))
+            else:
+                db.execute(
+                    "INSERT INTO llm_waiters (id, priority, seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET seen = excluded.seen",
+                    (waiter_id, priority, now),
+                )
+            return wait
+
+        return self._transaction(body)
+
+    def leave(self, waiter):
+        self._transaction(lambda db: db.execute(
+            "DELETE FROM llm_waiters WHERE id = ?", (self.waiter_id(waiter),)
+        ))
+
+    def give(self, amount, requests=0):
+        def body(db):
+            tokens, request_bucket, _ = self._load(db)
+            now = time.time()
+            tokens.wait_time(0, now)
+            request_bucket.wait_time(0, now)
+            tokens.give(amount)
+            request_bucket.give(requests)
+            self._save(db, tokens, request_bucket)
+        self._transaction(body)
+
+    def pause(self, seconds):
+        self._transaction(lambda db: db.execute(
+            "UPDATE llm_limits SET level = MAX(level, ?) WHERE name = 'paused_until'",
+            (time.time() + seconds,),
+        ))
+
+    def levels(self):
+        tokens, requests, _ = self._load(self._connect())
+        now = time.time()
+        tokens.wait_time(0, now)
+        requests.wait_time(0, now)
+        return tokens.level, requests.level
+
+
+class Scheduler:
+    """
+    Admits calls in (priority, arrival) order once both buckets allow it.
+    Not thread-affine: any thread may acquire.
+
+    With `state_path` the buckets and each process's next waiter live in
+    that SQLite file, so limits and priority hold across every process
+    using it. Without it, each process has its own buckets and the limits
+    must be divided between processes by hand.
+    """
+
+    def __init__(self, tokens_per_minute, requests_per_minute, state_path=None):
+        if state_path:
+            self.limits = SharedLimits(state_path, tokens_per_minute, requests_per_minute)
+            self.max_wait = SHARED_POLL_SECONDS  # keep the waiter row fresh
+        else:
+            self.limits = LocalLimits(tokens_per_minute, requests_per_minute)
+            self.max_wait = None
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _join(self, entry):
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+
+    def _admit(self, entry, cost):
+        """
+        None while `entry` is not next in line in this process, else the
+        seconds until it may go (0 = admitted, capacity taken)
+        """
+        with self._cond:
+            if self._queue[0] != entry:
+                return None
+            wait = self.limits.try_take(cost, entry)
+        return wait if self.max_wait is None else min(wait, self.max_wait)
+
+    def _leave(self, entry):
+        with self._cond:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self.limits.leave(entry)
+            self._cond.notify_all()
+
+    def _refund(self, cost):
+        # Admitted, but the caller went away before using it
+        with self._cond:
+            self.limits.give(cost, requests=1)
+            self._cond.notify_all()
+
+    def acquire(self, cost, priority=PRIORITY_NORMAL, timeout=None):
+        """
+        Block until the call may go out; returns the seconds spent waiting
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        entry = (priority, next(self._seq))
+
+        self._join(entry)
+        try:
+            while True:
+                wait = self._admit(entry, cost)
+                now = time.monotonic()
+                if wait is not None and wait <= 0:
+                    return now - start
+
+                if deadline is not None:
+                    if now >= deadline:
+                        raise LLMQueueTimeout(f"waited {now - start:.1f}s for LLM capacity")
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+
+                with self._cond:
+                    # Woken by notify_all when the line moves
+                    if wait is None and self._queue[0] != entry:
+                        self._cond.wait()
+                    elif wait is not None:
+                        self._cond.wait(timeout=wait)
+        finally:
+            self._leave(entry)
+
+    async def _off_loop(self, func, *args):
+        """
+        (result, cancelled) of a blocking step (lock, SQLite) run in a worker
+        thread. The step always runs to completion, even if the caller is
+        cancelled meanwhile, so the queue and buckets stay consistent.
+        """
+        task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        cancelled = False
+        while True:
+            try:
+                return await asyncio.shield(task), cancelled
+            except asyncio.CancelledError:
+                if task.done() and task.cancelled():
+                    raise
+                cancelled = True
+
+    async def acquire_async(self, cost, priority=PRIORITY_NORMAL, timeout=None):
+        """
+        acquire() for coroutines: waits with asyncio.sleep instead of holding
+        a thread and never blocks the event loop, and cancelling the caller
+        (client disconnect) takes it out of the queue.
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        entry = (priority, next(self._seq))
+
+        _, cancelled = await self._off_loop(self._join, entry)
+        try:
+            while not cancelled:
+                wait, cancelled = await self._off_loop(self._admit, entry, cost)
+                now = time.monotonic()
+                if wait is not None and wait <= 0:
+                    if cancelled:
+                        await self._off_loop(self._refund, cost)
+                        break
+                    return now - start
+
+                if deadline is not None and now >= deadline:
+                    raise LLMQueueTimeout(f"waited {now - start:.1f}s for LLM capacity")
+
+                # Not next in line: poll, since threads can't wake a coroutine
+                wait = ASYNC_POLL_SECONDS if wait is None else wait
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    cancelled = True
+        finally:
+            await self._off_loop(self._leave, entry)
+
+        raise asyncio.CancelledError()
+
+    def settle(self, estimated, actual):
+        with self._cond:
+            self.limits.give(estimated - actual)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """
+        Hold every call for `seconds` (after the provider answered 429)
+        """
+        with self._cond:
+            self.limits.pause(seconds)
+
+    def levels(self):
+        """
+        (tokens, requests) available right now
+        """
+        with self._cond:
+            return self.limits.levels()
+
+    def queue_depth(self):
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            return depth
+
+
+def prompt_tokens(messages):
+    # ~4 characters per token
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+def estimate_tokens(messages, max_tokens):
+    # The prompt plus the whole completion budget
+    return prompt_tokens(messages) + (max_tokens or 1024)
+
+
+def retry_delay(error, attempt, base=0.5, cap=20.0):
+    """
+    Retry-After if the provider sent one, else full-jitter exponential backoff
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ==================================================
+# METRICS
+# ==================================================
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "errors": 0,
+        }
+        self.in_flight = 0
+        self.queue_wait = {name: deque(maxlen=LATENCY_WINDOW) for name in PRIORITY_NAMES.values()}
+        self.latency = {name: deque(maxlen=LATENCY_WINDOW) for name in PRIORITY_NAMES.values()}
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, priority, waited, latency):
+        name = PRIORITY_NAMES.get(priority, "normal")
+        with self._lock:
+            self.in_flight -= 1
+            self.queue_wait[name].append(waited)
+            if latency is not None:
+                self.latency[name].append(latency)
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"count": 0, "p50_ms": None, "p95_ms": None}
+        ordered = sorted(samples)
+        pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))] * 1000, 1)
+        return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95)}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "queue_wait": {k: self._summary(v) for k, v in self.queue_wait.items()},
+                "latency": {k: self._summary(v) for k, v in self.latency.items()},
+            }
+
+
+# ==================================================
+# GATEWAY
+# ==================================================
+class LLMGateway:
+
+    def __init__(self, api_key=None, base_url=None, tokens_per_minute=30000,
+                 requests_per_minute=30, max_connections=20, max_retries=4,
+                 timeout=60, queue_timeout=120, cache=None, limits_path=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.scheduler = Scheduler(tokens_per_minute, requests_per_minute, state_path=limits_path)
+        self.metrics = Metrics()
+        self._cache = cache
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    # ---------------- clients ----------------
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = Groq(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=0,  # retried here, under the scheduler
+                    http_client=DefaultHttpxClient(limits=self._limits()),
+                )
+            return self._client
+
+    @property
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncGroq(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=0,
+                    http_client=DefaultAsyncHttpxClient(limits=self._limits()),
+                )
+            return self._async_client
+
+    @property
+    def cache(self):
+        return self._cache or get_cache()
+
+    # ---------------- calls ----------------
+    def _on_retry(self, error, attempt):
+        self.metrics.count("retries")
+        delay = retry_delay(error, attempt)
+        if isinstance(error, RateLimitError):
+            # Everyone backs off, not just this call
+            self.metrics.count("rate_limited")
+            self.scheduler.pause(delay)
+        return delay
+
+    def complete(self, messages, *, model=DEFAULT_MODEL, priority=PRIORITY_NORMAL,
+                 timeout=None, ttl_seconds=None, cache_salt=None, cache=True, **params):
+        """
+        Reply text for a chat completion, served from the cache when possible.
+
+        `cache_salt` separates entries that share a prompt but should differ.
+        `cache=False` bypasses the cache, for sampled replies that should
+        differ on every call. Errors are never cached.
+        """
+        key = LLMCache.make_key(model=model, messages=messages, salt=cache_salt, **params)
+
+        cached = self.cache.get(key) if cache else None
+        if cached is not None:
+            self.metrics.count("cache_hits")
+            return cached
+
+        client = self.client if timeout is None else self.client.with_options(timeout=timeout)
+        estimate = estimate_tokens(messages, params.get("max_tokens"))
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.scheduler.acquire(estimate, priority, timeout=self.queue_timeout)
+            self.metrics.count("requests")
+            self.metrics.started()
+            t0 = time.monotonic()
+            latency = None
+
+            try:
+                response = client.chat.completions.create(model=model, messages=messages, **params)
+                latency = time.monotonic() - t0
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self.metrics.count("errors")
+                    raise
+                response, delay = None, self._on_retry(e, attempt)
+            except Exception:
+                self.metrics.count("errors")
+                raise
+            finally:
+                self.metrics.finished(priority, waited, latency)
+
+            if response is None:
+                time.sleep(delay)
+                continue
+
+            if response.usage is not None:
+                self.scheduler.settle(estimate, response.usage.total_tokens)
+
+            content = response.choices[0].message.content.strip()
+            if cache:
+                self.cache.set(key, content, ttl_seconds=ttl_seconds)
+            return content
+
+    async def stream(self, messages, *, model=DEFAULT_MODEL, priority=PRIORITY_INTERACTIVE,
+                     ttl_seconds=None, cache_salt=None, **params):
+        """
+        Async generator over reply text deltas.
+
+        A cached reply is yielded in one piece. The reply is cached only if
+        the stream runs to completion; if the consumer stops early (client
+        disconnect, scope check abort) the upstream request is closed.
+        Only opening the stream is retried.
+        """
+        key = LLMCache.make_key(model=model, messages=messages, salt=cache_salt, **params)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.count("cache_hits")
+            yield cached
+            return
+
+        estimate = estimate_tokens(messages, params.get("max_tokens"))
+
+        for attempt in range(self.max_retries + 1):
+            waited = await self.scheduler.acquire_async(estimate, priority, self.queue_timeout)
+            self.metrics.count("requests")
+            try:
+                stream = await self.async_client.chat.completions.create(
+                    model=model, messages=messages, stream=True, **params
+                )
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self.metrics.count("errors")
+                    raise
+                await asyncio.sleep(self._on_retry(e, attempt))
+            except Exception:
+                self.metrics.count("errors")
+                raise
+
+        self.metrics.started()
+        t0 = time.monotonic()
+        latency = None
+        parts = []
+        usage = None
+
+        try:
+            async for chunk in stream:
+                # Groq reports usage on the last chunk, under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or chunk.usage or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            latency = time.monotonic() - t0
+        finally:
+            self.metrics.finished(priority, waited, latency)
+            await stream.close()
+            # Stopped early or no usage sent: prompt plus what was generated
+            if usage is not None:
+                used = usage.total_tokens
+            else:
+                used = prompt_tokens(messages) + len("".join(parts)) // 4
+            self.scheduler.settle(estimate, used)
+
+        self.cache.set(key, "".join(parts).strip(), ttl_seconds=ttl_seconds)
+
+    def stats(self):
+        tokens, requests = self.scheduler.levels()
+        return {
+            **self.metrics.snapshot(),
+            "queue_depth": self.scheduler.queue_depth(),
+            "tokens_available": round(tokens),
+            "requests_available": round(requests, 2),
+        }
+
+
+# ==================================================
+# SHARED INSTANCE
+# ==================================================
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=getattr(settings, "LLM_BASE_URL", None),
+                tokens_per_minute=getattr(settings, "LLM_TOKENS_PER_MINUTE", 30000),
+                requests_per_minute=getattr(settings, "LLM_REQUESTS_PER_MINUTE", 30),
+                max_connections=getattr(settings, "LLM_MAX_CONNECTIONS", 20),
+                max_retries=getattr(settings, "LLM_MAX_RETRIES", 4),
+                queue_timeout=getattr(settings, "LLM_QUEUE_TIMEOUT", 120),
+                limits_path=getattr(settings, "LLM_LIMITS_PATH", None),
+            )
+
+    return _gateway
+
+
+def complete(messages, **kwargs):
+    return get_gateway().complete(messages, **kwargs)
+
+
+def stream(messages, **kwargs):
+    return get_gateway().stream(messages, **kwargs)
+
+
+def gateway_stats():
+    return get_gateway().stats()
@@ -1,29 +1,133 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+"""
+Lecture notes, map-reduce style.
+
+The lecture is cut into ~SECTION_WORDS sections at timeline segment
+boundaries. Each section is summarized on its own (concurrently), and
+the summaries are reduced into the final markdown. Section boundaries
+depend only on the transcript, so a section's prompt - and the gateway
+cache entry keyed on its hash - is the same for full-lecture notes and
+for any watched range that covers it: watched notes only summarize the
+unfinished tail section.
+"""
+
+import asyncio
+import bisect
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import llm_gateway
+
+NOT_ENOUGH_CONTENT = "Not enough content to generate notes."
+
+SECTION_WORDS = 600
+# Content up to this size goes to the notes prompt as is
+DIRECT_WORDS = 1800
+# Summaries merged per call when they are still too long to reduce at once
+MERGE_FANOUT = 8
+
+DEFAULT_SECTION_TTL_SECONDS = 30 * 24 * 3600
+
+
+# ==================================================
+# SECTIONS
+# ==================================================
+def split_sections(transcript, section_words=SECTION_WORDS):
+    """
+    (start, end) character ranges of full_text, ~section_words each,
+    cut where a timeline segment ends
+    """
+    cached = transcript.derived.get(("notes_sections", section_words))
+    if cached is not None:
+        return cached
 
-load_dotenv()
+    text = transcript.full_text
+    word_ends = [m.end() for m in re.finditer(r"\S+", text)]
+    sections, start, start_words = [], 0, 0
 
-# ✅ THIS WAS MISSING OR MISNAMED EARLIER
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    for offset in sorted(set(transcript.offsets)):
+        words = bisect.bisect_right(word_ends, offset)
+        if words - start_words >= section_words:
+            sections.append((start, offset))
+            start, start_words = offset, words
 
+    if start_words < len(word_ends):
+        sections.append((start, len(text)))
 
-def generate_notes(transcript, title="Lecture Notes", mode="watched"):
+    transcript.derived[("notes_sections", section_words)] = sections
+    return sections
+
+
+def notes_parts(transcript, upto_offset, from_offset=0):
     """
-    Generate clean, student-friendly notes.
+    Texts to summarize for full_text[from_offset:upto_offset]: every whole
+    section in range, plus the partial sections at either end
     """
+    text = transcript.full_text
+    parts, covered = [], from_offset
+
+    for start, end in split_sections(transcript):
+        if end <= from_offset:
+            continue
+        if end > upto_offset:
+            break
+        parts.append(text[covered:end].strip())
+        covered = end
+
+    tail = text[covered:upto_offset].strip()
+    if tail:
+        parts.append(tail)
+
+    return [p for p in parts if p]
+
+
+# ==================================================
+# PROMPTS
+# ==================================================
+SECTION_PROMPT = """
+Summarize this part of a lecture for a student's study notes.
+
+Rules:
+- 4 to 8 bullet points
+- Keep every definition, key term, example and formula
+- No introduction, no conclusion
+
+LECTURE PART:
+{text}
+"""
+
+MERGE_PROMPT = """
+These are summaries of consecutive parts of a lecture, in order.
+Merge them into one summary of 8 to 12 bullet points.
+Keep every key term and definition; drop repetition.
+
+SUMMARIES:
+{text}
+"""
+
+SECTION_PARAMS = {
+    "model": "llama-3.1-8b-instant",
+    "temperature": 0,
+    "max_tokens": 300,
+}
 
-    if not transcript or len(transcript.split()) < 80:
-        return "Not enough content to generate notes."
 
-    # limit size (LLM safe)
-    transcript = " ".join(transcript.split()[:1800])
+def build_notes_prompt(content, title="Lecture Notes", mode="watched", summarized=False):
+    """
+    Notes prompt shared by generate_notes and stream_notes
+    """
 
     if mode == "watched":
         scope = "ONLY what the student has watched so far"
     else:
         scope = "the COMPLETE lecture content"
 
+    if summarized:
+        label = "SUMMARIES OF THE LECTURE, PART BY PART"
+    else:
+        label = "LECTURE CONTENT"
+
     prompt = f"""
 You are a university professor creating EXAM-ORIENTED STUDY NOTES.
 
@@ -51,19 +155,201 @@ Explain the topic in simple language (5–6 lines).
 ## Key Takeaways
 - 3 short bullet points
 
-LECTURE CONTENT:
-{transcript}
+{label}:
+{content}
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            max_tokens=800
-        )
+    return prompt
+
+
+def build_extension_prompt(content, summarized=False):
+    """
+    Prompt for the notes of a newly watched part, appended to earlier notes
+    """
+
+    if summarized:
+        label = "SUMMARIES OF THE NEW PART, IN ORDER"
+    else:
+        label = "NEW LECTURE CONTENT"
+
+    prompt = f"""
+You are a university professor extending a student's EXAM-ORIENTED STUDY NOTES
+with the part of the lecture they have just watched.
+
+Rules:
+- Simple English
+- Beginner friendly
+- Cover ONLY this new part
+- No title, no introduction
+
+FORMAT STRICTLY IN MARKDOWN:
+
+## <short title of this part>
+- 3 to 5 key points
+
+**Important Terms**
+- **Term** – simple meaning
+
+{label}:
+{content}
+"""
 
-        return response.choices[0].message.content.strip()
+    return prompt
+
+
+NOTES_PARAMS = {
+    "model": "llama-3.1-8b-instant",
+    "temperature": 0.5,
+    "max_tokens": 800,
+}
+
+EXTENSION_PARAMS = {
+    "model": "llama-3.1-8b-instant",
+    "temperature": 0.5,
+    "max_tokens": 400,
+}
+
+
+# ==================================================
+# MAP-REDUCE
+# ==================================================
+def summarize(prompt):
+    """
+    One map/merge call; cached by the gateway under a hash of the prompt
+    """
+    return llm_gateway.complete(
+        [{"role": "user", "content": prompt}],
+        priority=llm_gateway.PRIORITY_NORMAL,
+        ttl_seconds=getattr(settings, "NOTES_SECTION_TTL_SECONDS", DEFAULT_SECTION_TTL_SECONDS),
+        **SECTION_PARAMS
+    )
+
+
+def word_count(texts):
+    return sum(len(t.split()) for t in texts)
+
+
+def notes_content(transcript, upto_offset, from_offset=0, llm=None, concurrency=None):
+    """
+    (content, summarized) for the notes prompt covering
+    full_text[from_offset:upto_offset]
+    """
+    parts = notes_parts(transcript, upto_offset, from_offset)
+    if word_count(parts) <= DIRECT_WORDS:
+        return "\n".join(parts), False
+
+    llm = llm or summarize
+    concurrency = concurrency or getattr(settings, "NOTES_LLM_CONCURRENCY", 4)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        summaries = list(pool.map(llm, [SECTION_PROMPT.format(text=p) for p in parts]))
+
+        # Very long lectures: merge summaries in fixed groups until they fit
+        while word_count(summaries) > DIRECT_WORDS and len(summaries) > 1:
+            groups = [
+                "\n\n".join(summaries[i:i + MERGE_FANOUT])
+                for i in range(0, len(summaries), MERGE_FANOUT)
+            ]
+            summaries = list(pool.map(llm, [MERGE_PROMPT.format(text=g) for g in groups]))
+
+    content = "\n\n".join(f"### Part {i + 1}\n{s}" for i, s in enumerate(summaries))
+    return content, True
+
+
+def has_enough_content(transcript, upto_offset):
+    return len(transcript.full_text[:upto_offset].split()) >= 80
+
+
+def build_notes(transcript, upto_offset, title="Lecture Notes", mode="watched"):
+    """
+    Notes markdown for full_text[:upto_offset]; raises on LLM errors
+    """
+    content, summarized = notes_content(transcript, upto_offset)
+    prompt = build_notes_prompt(content, title, mode, summarized)
+
+    # Same prompt (e.g. full-lecture notes) -> served from the cache
+    return llm_gateway.complete(
+        [{"role": "user", "content": prompt}],
+        priority=llm_gateway.PRIORITY_NORMAL,
+        **NOTES_PARAMS
+    )
+
+
+def extend_notes(transcript, from_offset, upto_offset):
+    """
+    Markdown to append to notes that cover full_text[:from_offset];
+    raises on LLM errors
+    """
+    content, summarized = notes_content(transcript, upto_offset, from_offset)
+
+    return llm_gateway.complete(
+        [{"role": "user", "content": build_extension_prompt(content, summarized)}],
+        priority=llm_gateway.PRIORITY_NORMAL,
+        **EXTENSION_PARAMS
+    )
+
+
+def generate_notes(transcript, upto_offset=None, title="Lecture Notes", mode="watched"):
+    """
+    Generate clean, student-friendly notes for full_text[:upto_offset]
+    (the whole lecture by default).
+    """
+
+    if upto_offset is None:
+        upto_offset = len(transcript.full_text)
+
+    if not has_enough_content(transcript, upto_offset):
+        return NOT_ENOUGH_CONTENT
+
+    try:
+        return build_notes(transcript, upto_offset, title, mode)
 
     except Exception as e:
         return f"Notes generation failed: {e}"
+
+
+async def stream_notes(transcript, upto_offset=None, title="Lecture Notes", mode="watched"):
+    """
+    generate_notes, yielding markdown text as the final (reduce) step
+    generates it
+    """
+
+    if upto_offset is None:
+        upto_offset = len(transcript.full_text)
+
+    if not has_enough_content(transcript, upto_offset):
+        yield NOT_ENOUGH_CONTENT
+        return
+
+    # Section summaries are blocking gateway calls
+    content, summarized = await asyncio.to_thread(notes_content, transcript, upto_offset)
+    prompt = build_notes_prompt(content, title, mode, summarized)
+
+    tokens = llm_gateway.stream(
+        [{"role": "user", "content": prompt}],
+        priority=llm_gateway.PRIORITY_INTERACTIVE,
+        **NOTES_PARAMS
+    )
+    try:
+        async for delta in tokens:
+            yield delta
+    finally:
+        await tokens.aclose()
+
+
+async def stream_extension(transcript, from_offset, upto_offset):
+    """
+    extend_notes, yielding markdown text as it is generated
+    """
+    content, summarized = await asyncio.to_thread(notes_content, transcript, upto_offset, from_offset)
+
+    tokens = llm_gateway.stream(
+        [{"role": "user", "content": build_extension_prompt(content, summarized)}],
+        priority=llm_gateway.PRIORITY_INTERACTIVE,
+        **EXTENSION_PARAMS
+    )
+    try:
+        async for delta in tokens:
+            yield delta
+    finally:
+        await tokens.aclose()
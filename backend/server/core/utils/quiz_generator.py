@@ -1,66 +1,36 @@
-import os
 import json
 import random
 import re
-from groq import Groq
-from dotenv import load_dotenv
-
-# ==================================================
-# ENV + CLIENT
-# ==================================================
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-META_PATH = os.path.join(os.path.dirname(__file__), "quiz_meta.json")
-
-
-# ==================================================
-# META HELPERS
-# ==================================================
-def load_meta():
-    if not os.path.exists(META_PATH):
-        return {}
-    try:
-        with open(META_PATH, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from django.conf import settings
 
-def save_meta(data):
-    with open(META_PATH, "w") as f:
-        json.dump(data, f, indent=2)
-
-
-def get_attempt(video_id):
-    return load_meta().get(video_id, 0)
-
-
-def increase_attempt(video_id):
-    meta = load_meta()
-    meta[video_id] = meta.get(video_id, 0) + 1
-    save_meta(meta)
+from . import llm_gateway
+from .similarity import NearDuplicateIndex
 
 
 # ==================================================
 # TEXT HELPERS
 # ==================================================
-def normalize(text):
-    return re.sub(r"[^a-z0-9]", "", text.lower())
-
-
-def is_similar(q1, q2):
-    return normalize(q1)[:60] == normalize(q2)[:60]
+def split_transcript(transcript, chunk_words=140):
+    return [text for text, _ in split_transcript_with_offsets(transcript, chunk_words)]
 
 
-def split_transcript(transcript, chunk_words=140):
-    words = transcript.split()
+def split_transcript_with_offsets(transcript, chunk_words=140):
+    """
+    Same chunks as split_transcript, each with the character offset in
+    `transcript` where it ends (used to match chunks to the watched range)
+    """
+    spans = [m.span() for m in re.finditer(r"\S+", transcript)]
     chunks = []
 
-    for i in range(0, len(words), chunk_words):
-        part = words[i:i + chunk_words]
+    for i in range(0, len(spans), chunk_words):
+        part = spans[i:i + chunk_words]
         if len(part) > 45:
-            chunks.append(" ".join(part))
+            text = " ".join(transcript[a:b] for a, b in part)
+            chunks.append((text, part[-1][1]))
 
     return chunks
 
@@ -94,6 +64,10 @@ Create 1 TRUE/FALSE MCQ with options:
 """
 ]
 
+# Names stored with banked questions: "basic" + one per STYLE_PROMPTS entry
+STYLE_NAMES = ["concept", "scenario", "output", "true_false"]
+PROMPTS_BY_STYLE = {"basic": BASIC_PROMPT, **dict(zip(STYLE_NAMES, STYLE_PROMPTS))}
+
 
 # ==================================================
 # LLM HELPERS
@@ -113,40 +87,22 @@ def clean_json(text):
     return text
 
 
-def call_llm(prompt):
-    response = client.chat.completions.create(
+def call_llm(prompt, priority=llm_gateway.PRIORITY_NORMAL):
+    return llm_gateway.complete(
+        [{"role": "user", "content": prompt}],
         model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": prompt}],
+        priority=priority,
+        # Per-call timeout so one slow request cannot stall a quiz
+        timeout=getattr(settings, "QUIZ_LLM_TIMEOUT", 20),
         temperature=0.85,
-        max_tokens=700
+        max_tokens=700,
+        # Sampled questions: a cached reply would hand every student the same quiz
+        cache=False
     )
-    return response.choices[0].message.content.strip()
-
-
-# ==================================================
-# 🔥 MAIN QUIZ GENERATOR (WITH EXPLANATION)
-# ==================================================
-def generate_quiz(transcript, video_id, max_questions=6):
-
-    if not transcript or len(transcript.split()) < 80:
-        return []
-
-    attempt = get_attempt(video_id)
-
-    chunks = split_transcript(transcript)
-    random.shuffle(chunks)
-
-    collected = []
-    used_questions = []
-
-    for chunk in chunks:
 
-        if len(collected) >= max_questions:
-            break
 
-        style_prompt = BASIC_PROMPT if attempt == 0 else random.choice(STYLE_PROMPTS)
-
-        prompt = f"""
+def build_quiz_prompt(style_prompt, chunk):
+    return f"""
 {style_prompt}
 
 STRICT RULES:
@@ -169,41 +125,154 @@ TEXT:
 {chunk}
 """
 
-        try:
-            raw = call_llm(prompt)
-            raw = clean_json(raw)
-            questions = json.loads(raw)
 
-            for q in questions:
+def is_valid_question(q):
+    if not isinstance(q, dict):
+        return False
+
+    if not all(k in q for k in ["question", "options", "correct_index", "explanation"]):
+        return False
+
+    if not isinstance(q["options"], list) or len(q["options"]) != 4:
+        return False
+
+    if not isinstance(q["correct_index"], int):
+        return False
+
+    if not str(q["explanation"]).strip():
+        return False
 
-                # 🔒 VALIDATION
-                if not all(k in q for k in ["question", "options", "correct_index", "explanation"]):
-                    continue
+    return True
+
+
+def parse_questions(raw):
+    """
+    Valid questions from one raw LLM reply ([] if unparsable)
+    """
+    try:
+        questions = json.loads(clean_json(raw))
+    except ValueError as e:
+        print("QUIZ ERROR:", e)
+        return []
 
-                if not isinstance(q["options"], list) or len(q["options"]) != 4:
-                    continue
+    if not isinstance(questions, list):
+        return []
 
-                if not isinstance(q["correct_index"], int):
-                    continue
+    return [q for q in questions if is_valid_question(q)]
 
-                if not q["explanation"].strip():
-                    continue
 
-                # 🔁 DUPLICATE CHECK
-                if any(is_similar(q["question"], used) for used in used_questions):
-                    continue
+# ==================================================
+# 🔥 MAIN QUIZ GENERATOR (WITH EXPLANATION)
+# ==================================================
+def generate_quiz(transcript, attempt=0, max_questions=6, llm=None,
+                  concurrency=None, call_timeout=None):
+    """
+    Fan chunk prompts out to the LLM a few at a time and keep the first
+    max_questions valid, non-duplicate questions to come back.
 
-                collected.append(q)
-                used_questions.append(q["question"])
+    `attempt` is how many quizzes the student has already taken on this
+    lecture: the first gets basic questions, retakes the other styles.
+    `llm` defaults to call_llm; tests and benchmarks pass a fake.
+    """
 
+    if not transcript or len(transcript.split()) < 80:
+        return []
+
+    llm = llm or call_llm
+    concurrency = concurrency or getattr(settings, "QUIZ_LLM_CONCURRENCY", 4)
+    call_timeout = call_timeout or getattr(settings, "QUIZ_LLM_TIMEOUT", 20)
+
+    chunks = split_transcript(transcript)
+    random.shuffle(chunks)
+
+    prompts = iter([
+        build_quiz_prompt(
+            BASIC_PROMPT if attempt == 0 else random.choice(STYLE_PROMPTS),
+            chunk
+        )
+        for chunk in chunks
+    ])
+
+    collected = []
+    used_questions = NearDuplicateIndex()
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    stopped = threading.Event()
+    in_flight = {}  # future -> {"started": monotonic time once the call runs}
+    abandoned = []  # timed-out calls still holding a pool thread
+
+    def run(prompt, state):
+        # Picked up after the quiz was done: don't spend tokens on it
+        if stopped.is_set():
+            return None
+        state["started"] = time.monotonic()
+        return llm(prompt)
+
+    def dispatch():
+        # Only onto a free thread, never queued behind an abandoned call
+        abandoned[:] = [f for f in abandoned if not f.done()]
+        if len(in_flight) + len(abandoned) >= concurrency:
+            return
+
+        prompt = next(prompts, None)
+        if prompt is not None:
+            state = {}
+            in_flight[pool.submit(run, prompt, state)] = state
+
+    try:
+        for _ in range(concurrency):
+            dispatch()
+
+        while in_flight and len(collected) < max_questions:
+            # Deadlines run from when a call starts, not from when it was queued
+            deadlines = [s["started"] + call_timeout for s in in_flight.values() if "started" in s]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else 0.05
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            # Stop waiting on calls past their deadline. A running call can't be
+            # interrupted: its thread stays busy until the gateway's HTTP timeout
+            # ends it, and only then takes another chunk.
+            now = time.monotonic()
+            for future, state in list(in_flight.items()):
+                if future not in done and state.get("started", now) + call_timeout <= now:
+                    print("QUIZ ERROR: LLM call timed out")
+                    del in_flight[future]
+                    abandoned.append(future)
+                    dispatch()
+
+            for future in done:
                 if len(collected) >= max_questions:
                     break
 
-        except Exception as e:
-            print("QUIZ ERROR:", e)
-            continue
+                del in_flight[future]
+
+                try:
+                    # 🔒 VALIDATION
+                    questions = parse_questions(future.result())
+                except Exception as e:
+                    print("QUIZ ERROR:", e)
+                    questions = []
+
+                for q in questions:
+
+                    # 🔁 DUPLICATE CHECK
+                    if not used_questions.add(q["question"]):
+                        continue
+
+                    collected.append(q)
+
+                    if len(collected) >= max_questions:
+                        break
+
+                if len(collected) < max_questions:
+                    dispatch()
+
+    finally:
+        # Queued calls are dropped; calls already talking to the API finish
+        # in the background (bounded by the gateway's HTTP timeout)
+        stopped.set()
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    increase_attempt(video_id)
     random.shuffle(collected)
 
     return collected
@@ -0,0 +1,216 @@
+"""
+Per-lecture BM25 retrieval over timeline-aligned transcript chunks.
+
+The index is built once per transcript, persisted as
+<video_id>.bm25.npz next to it, and scored with NumPy posting arrays
+(a CSC-style term -> (chunk, tf) layout), so a query only touches the
+postings of its own terms.
+"""
+
+import io
+import json
+import re
+import zipfile
+
+import numpy as np
+from django.conf import settings
+
+from .transcript_store import WORDS_PER_SECOND, artifact_path, atomic_write_bytes
+
+CHUNK_WORDS = 120
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = {
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
+    "of", "with", "by", "is", "are", "was", "were", "be", "been", "this",
+    "that", "these", "those", "it", "its", "as", "so", "we", "you", "i",
+    "what", "how", "why", "do", "does", "can", "about", "lecture",
+}
+
+
+# ==================================================
+# TEXT HELPERS
+# ==================================================
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOP_WORDS]
+
+
+def build_chunks(transcript, chunk_words=CHUNK_WORDS):
+    """
+    Group timeline segments into ~chunk_words passages with start/end times
+    """
+    chunks = []
+
+    if not transcript.timeline:
+        # Legacy transcripts: slice words at the fixed speaking rate
+        words = transcript.words
+        for i in range(0, len(words), chunk_words):
+            part = words[i:i + chunk_words]
+            chunks.append({
+                "start": round(i / WORDS_PER_SECOND, 2),
+                "end": round((i + len(part)) / WORDS_PER_SECOND, 2),
+                "text": " ".join(part),
+            })
+        return chunks
+
+    current, count, start = [], 0, None
+    for seg in transcript.timeline:
+        if start is None:
+            start = seg["start"]
+        current.append(seg["text"])
+        count += len(seg["text"].split())
+
+        if count >= chunk_words:
+            chunks.append({"start": start, "end": seg["end"], "text": " ".join(current)})
+            current, count, start = [], 0, None
+
+    if current:
+        chunks.append({
+            "start": start,
+            "end": transcript.timeline[-1]["end"],
+            "text": " ".join(current),
+        })
+
+    return chunks
+
+
+# ==================================================
+# INDEX
+# ==================================================
+class BM25Index:
+
+    def __init__(self, chunks, vocab, term_ptr, doc_ids, tfs, doc_len):
+        self.chunks = chunks
+        self.vocab = vocab
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+
+        n_docs = len(chunks)
+        df = np.diff(term_ptr).astype(np.float64)
+        self.idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        avgdl = doc_len.mean() if n_docs else 1.0
+        self.norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avgdl, 1e-9))
+
+    @classmethod
+    def build(cls, chunks):
+        vocab = {}
+        postings = []  # (term_id, doc_id, tf)
+        doc_len = np.zeros(len(chunks), dtype=np.float32)
+
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk["text"])
+            doc_len[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                term_id = vocab.setdefault(token, len(vocab))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            postings.extend((term_id, doc_id, tf) for term_id, tf in counts.items())
+
+        if postings:
+            arr = np.array(postings, dtype=np.int64)
+            arr = arr[np.lexsort((arr[:, 1], arr[:, 0]))]
+            term_ids, doc_ids, tfs = arr[:, 0], arr[:, 1].astype(np.int32), arr[:, 2].astype(np.float32)
+        else:
+            term_ids = np.zeros(0, dtype=np.int64)
+            doc_ids = np.zeros(0, dtype=np.int32)
+            tfs = np.zeros(0, dtype=np.float32)
+
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=term_ptr[1:])
+
+        return cls(chunks, vocab, term_ptr, doc_ids, tfs, doc_len)
+
+    def search(self, query, k=4):
+        """
+        Top-k chunks for `query`, best first, as dicts with a "score" key
+        """
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or not self.chunks:
+            return []
+
+        scores = np.zeros(len(self.chunks), dtype=np.float64)
+        for term_id in term_ids:
+            lo, hi = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi]
+            scores[docs] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self.norm[docs])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [dict(self.chunks[i], score=round(float(scores[i]), 4)) for i in top]
+
+    # ---------------- persistence ----------------
+    def save(self, path, transcript_mtime):
+        vocab_terms = np.array(sorted(self.vocab, key=self.vocab.get), dtype=str)
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            chunks=np.array(json.dumps(self.chunks)),
+            vocab=vocab_terms,
+            term_ptr=self.term_ptr,
+            doc_ids=self.doc_ids,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+            transcript_mtime=np.array(transcript_mtime, dtype=np.int64),
+        )
+        atomic_write_bytes(path, buf.getvalue())
+
+    @classmethod
+    def load(cls, path, transcript_mtime):
+        """
+        Returns None if the file is missing, unreadable (truncated, corrupt)
+        or was built from another version
+        """
+        try:
+            with np.load(path) as data:
+                if int(data["transcript_mtime"]) != transcript_mtime:
+                    return None
+                return cls(
+                    json.loads(str(data["chunks"])),
+                    {term: i for i, term in enumerate(data["vocab"].tolist())},
+                    data["term_ptr"],
+                    data["doc_ids"],
+                    data["tfs"],
+                    data["doc_len"],
+                )
+        except (OSError, EOFError, zipfile.BadZipFile, KeyError, ValueError):
+            return None
+
+
+# ==================================================
+# PUBLIC API
+# ==================================================
+def index_path(video_id):
+    return artifact_path(video_id, ".bm25.npz")
+
+
+def get_retrieval_index(transcript):
+    """
+    BM25 index for a Transcript: in memory, else from disk, else built + saved
+    """
+    index = transcript.derived.get("bm25")
+    if index is not None:
+        return index
+
+    path = index_path(transcript.video_id)
+    index = BM25Index.load(path, transcript.mtime)
+
+    if index is None:
+        index = BM25Index.build(build_chunks(transcript))
+        index.save(path, transcript.mtime)
+
+    transcript.derived["bm25"] = index
+    return index
+
+
+def search_transcript(transcript, query, k=None):
+    k = k or getattr(settings, "RETRIEVAL_TOP_K", 4)
+    return get_retrieval_index(transcript).search(query, k=k)
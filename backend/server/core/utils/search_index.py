@@ -0,0 +1,225 @@
+"""
+Full-text search across lectures.
+
+Every transcript is cut into short timeline-aligned passages that are
+stored in one SQLite FTS5 table (search.sqlite3 next to the
+transcripts). FTS5 keeps an inverted index, so a query only reads the
+posting lists of its terms; results are ranked by bm25() and come with
+an HTML-escaped snippet, hits wrapped in <mark>. A lecture is re-indexed when its transcript is
+written (see jobs.py) or when its file is newer than the indexed copy.
+"""
+
+import html
+import re
+import sqlite3
+import threading
+
+from . import transcript_store
+from .retrieval import build_chunks
+from .transcript_store import load_transcript
+
+INDEX_NAME = "search.sqlite3"
+
+# Short passages: precise start/end, and the snippet shows the hit
+PASSAGE_WORDS = 40
+SNIPPET_TOKENS = 16
+
+# Private-use characters FTS5 puts around hits; swapped for <mark> once
+# the transcript text around them has been escaped
+MARK_START, MARK_END = "\ue000", "\ue001"
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+    text,
+    video_id UNINDEXED,
+    start UNINDEXED,
+    "end" UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS lectures (
+    video_id TEXT PRIMARY KEY,
+    transcript_mtime INTEGER NOT NULL
+);
+"""
+
+
+# ==================================================
+# CONNECTIONS
+# ==================================================
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def index_path():
+    return transcript_store.TRANSCRIPT_DIR / INDEX_NAME
+
+
+def connect():
+    """
+    This thread's connection to the index, created on first use
+    """
+    path = index_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+# ==================================================
+# INDEXING
+# ==================================================
+def index_transcript(transcript):
+    """
+    Replace the passages of one lecture in a single transaction
+    """
+    rows = [
+        (strip_marks(chunk["text"]), transcript.video_id, chunk["start"], chunk["end"])
+        for chunk in build_chunks(transcript, chunk_words=PASSAGE_WORDS)
+    ]
+
+    conn = connect()
+    with _write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM passages WHERE video_id = ?", (transcript.video_id,))
+            conn.executemany('INSERT INTO passages (text, video_id, start, "end") VALUES (?, ?, ?, ?)', rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO lectures (video_id, transcript_mtime) VALUES (?, ?)",
+                (transcript.video_id, transcript.mtime),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return len(rows)
+
+
+def stored_video_ids():
+    """
+    Video ids of the transcript files on disk (not artifacts like .idx.json)
+    """
+    video_ids = set()
+    for path in transcript_store.TRANSCRIPT_DIR.iterdir():
+        if path.suffix in (".tbin", ".txt", ".json") and "." not in path.stem:
+            video_ids.add(path.stem)
+    return sorted(video_ids)
+
+
+def sync_index():
+    """
+    Index lectures that are missing or stale, drop deleted ones;
+    returns the number of lectures (re)indexed
+    """
+    conn = connect()
+    indexed = dict(conn.execute("SELECT video_id, transcript_mtime FROM lectures"))
+    on_disk = stored_video_ids()
+
+    updated = 0
+    for video_id in on_disk:
+        transcript = load_transcript(video_id)
+        if transcript is not None and indexed.get(video_id) != transcript.mtime:
+            index_transcript(transcript)
+            updated += 1
+
+    for video_id in set(indexed) - set(on_disk):
+        with _write_lock:
+            conn.execute("DELETE FROM passages WHERE video_id = ?", (video_id,))
+            conn.execute("DELETE FROM lectures WHERE video_id = ?", (video_id,))
+
+    return updated
+
+
+_synced = set()
+_sync_lock = threading.Lock()
+
+
+def ensure_synced():
+    """
+    sync_index once per process, so transcripts written before the index
+    existed (or by another process) become searchable
+    """
+    path = index_path()
+    if path in _synced:
+        return
+
+    with _sync_lock:
+        if path not in _synced:
+            sync_index()
+            _synced.add(path)
+
+
+# ==================================================
+# QUERIES
+# ==================================================
+def strip_marks(text):
+    return text.replace(MARK_START, "").replace(MARK_END, "")
+
+
+def highlight(snippet):
+    """
+    Snippet from FTS5 as safe HTML: transcript text escaped, hits in <mark>
+    """
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def match_terms(query):
+    """
+    Words of a free-text query, each quoted so user input is never
+    parsed as FTS5 syntax
+    """
+    terms = re.findall(r"\w+", query.lower())
+    return [f'"{t}"' for t in terms]
+
+
+def _run_query(conn, terms, operator, k, video_id):
+    sql = (
+        'SELECT video_id, start, "end", '
+        "snippet(passages, 0, ?, ?, '…', ?), bm25(passages) "
+        "FROM passages WHERE passages MATCH ?"
+    )
+    params = [MARK_START, MARK_END, SNIPPET_TOKENS, f" {operator} ".join(terms)]
+    if video_id:
+        sql += " AND video_id = ?"
+        params.append(video_id)
+    sql += " ORDER BY bm25(passages) LIMIT ?"
+    params.append(k)
+
+    return conn.execute(sql, params).fetchall()
+
+
+def search(query, k=20, video_id=None):
+    """
+    Passages matching `query`, best first:
+    [{"video_id", "start", "end", "snippet" (HTML), "score"}]. Passages with all
+    the words rank first; if none has them all, any word matches.
+    """
+    terms = match_terms(query)
+    if not terms:
+        return []
+
+    ensure_synced()
+    conn = connect()
+
+    rows = _run_query(conn, terms, "AND", k, video_id)
+    if not rows and len(terms) > 1:
+        rows = _run_query(conn, terms, "OR", k, video_id)
+
+    return [
+        {
+            "video_id": vid,
+            "start": start,
+            "end": end,
+            "snippet": highlight(snippet),
+            # bm25() is lower-is-better
+            "score": round(-score, 4),
+        }
+        for vid, start, end, snippet, score in rows
+    ]
@@ -0,0 +1,138 @@
+"""
+Near-duplicate detection for quiz questions.
+
+Each question becomes a set of shingles (content words and word pairs,
+so reordered or lightly reworded questions still overlap) summarised by
+a MinHash signature. Signatures are split into LSH bands; only questions
+sharing a band bucket are compared, so a lookup costs the same whether
+the index holds ten questions or a lecture's whole history.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+from .retrieval import STOP_WORDS
+
+NUM_PERM = 64
+BANDS = 16
+DEFAULT_THRESHOLD = 0.6
+
+# Universal hashing (a * x + b) mod p on 32-bit shingle hashes; fits in uint64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+# MCQ boilerplate that says nothing about what is being asked
+QUESTION_STOP_WORDS = STOP_WORDS | {
+    "which", "following", "according", "best", "describe", "describes",
+    "statement", "statements", "true", "false", "correct", "text", "given",
+    "will", "would", "most", "likely", "s",
+}
+
+
+# ==================================================
+# TEXT HELPERS
+# ==================================================
+def _stem(token):
+    # Crude plural folding: "lists" ~ "list"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def shingles(text):
+    """
+    Content words plus adjacent word pairs of a normalized question
+    """
+    tokens = [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in QUESTION_STOP_WORDS]
+
+    if not tokens:
+        # Nothing but stop words: fall back to the exact normalized text
+        normalized = re.sub(r"[^a-z0-9]", "", text.lower())
+        return {normalized} if normalized else set()
+
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(shingle_set):
+    hashes = np.array(
+        [zlib.crc32(s.encode("utf-8")) for s in shingle_set] or [0],
+        dtype=np.uint64,
+    )
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+# ==================================================
+# INDEX
+# ==================================================
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over question texts.
+
+    `threshold` is the estimated Jaccard similarity of shingle sets at
+    which two questions count as duplicates.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+        if NUM_PERM % bands:
+            raise ValueError("bands must divide NUM_PERM")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+        self.texts = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _band_keys(self, signature):
+        return [
+            signature[i * self.rows:(i + 1) * self.rows].tobytes()
+            for i in range(self.bands)
+        ]
+
+    def _match(self, signature):
+        candidates = set()
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+
+        for i in candidates:
+            if np.mean(self.signatures[i] == signature) >= self.threshold:
+                return i
+        return None
+
+    def find(self, text):
+        """
+        An indexed question that `text` near-duplicates, else None
+        """
+        i = self._match(minhash(shingles(text)))
+        return None if i is None else self.texts[i]
+
+    def add(self, text):
+        """
+        Index `text` unless it near-duplicates an indexed question.
+        Returns True if it was added.
+        """
+        signature = minhash(shingles(text))
+        if self._match(signature) is not None:
+            return False
+
+        doc_id = len(self.texts)
+        self.texts.append(text)
+        self.signatures.append(signature)
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(key, []).append(doc_id)
+
+        return True
+
+    @classmethod
+    def from_texts(cls, texts, **kwargs):
+        index = cls(**kwargs)
+        for text in texts:
+            index.add(text)
+        return index
@@ -7,12 +7,77 @@ No new imports needed in views.py!
 """
 
 from youtube_transcript_api import YouTubeTranscriptApi
-import whisper
+from django.conf import settings
 import re
 import os
+import threading
 
-# Load Whisper model
-model = whisper.load_model("tiny")
+# Whisper model is loaded lazily on first use (see get_model)
+_model = None
+_model_lock = threading.Lock()
+
+WHISPER_OPTIONS = {
+    "fp16": False,
+    "language": "en",
+    "verbose": False,
+    "condition_on_previous_text": False,
+}
+
+
+def get_model():
+    """
+    Load the Whisper model once per process, on first use
+    """
+    global _model
+
+    with _model_lock:
+        if _model is None:
+            import whisper
+
+            size = getattr(settings, "WHISPER_MODEL_SIZE", "tiny")
+            device = getattr(settings, "WHISPER_DEVICE", None)
+            print(f"🔊 Loading Whisper model '{size}'...")
+            _model = whisper.load_model(size, device=device)
+
+    return _model
+
+
+def run_whisper(audio_path):
+    """
+    Transcribe with the shared model server if configured and reachable,
+    else in-process (chunked across a process pool for long audio when enabled)
+    """
+    socket_path = getattr(settings, "WHISPER_SERVER_SOCKET", None)
+
+    if socket_path:
+        from .whisper_server import transcribe_remote
+        try:
+            return transcribe_remote(socket_path, audio_path, WHISPER_OPTIONS)
+        except OSError as e:
+            # Server not running or restarting: transcribe here instead
+            print(f"⚠️ Whisper server unavailable ({e}), transcribing in-process")
+
+    workers = getattr(settings, "WHISPER_CHUNK_WORKERS", 1)
+    window_seconds = getattr(settings, "WHISPER_CHUNK_SECONDS", 300)
+
+    if workers > 1:
+        from .audio import probe_duration
+        from .chunked_transcriber import transcribe_chunked
+
+        duration = probe_duration(audio_path)
+        if duration > window_seconds:
+            return transcribe_chunked(
+                audio_path,
+                duration,
+                WHISPER_OPTIONS,
+                model_size=getattr(settings, "WHISPER_MODEL_SIZE", "tiny"),
+                device=getattr(settings, "WHISPER_DEVICE", None),
+                workers=workers,
+                window_seconds=window_seconds,
+                overlap_seconds=getattr(settings, "WHISPER_CHUNK_OVERLAP", 5),
+            )
+
+    return get_model().transcribe(audio_path, **WHISPER_OPTIONS)
 
 
 def extract_video_id(url):
@@ -60,18 +125,21 @@ def get_youtube_timestamps(youtube_url):
         return None
 
 
-def transcribe_audio(audio_path, youtube_url=None):
+def transcribe_audio(audio_path, youtube_url=None, on_progress=None):
     """
     🔥 HYBRID: Whisper text + YouTube timing
     
     Args:
         audio_path: Path to audio file
         youtube_url: (Optional) YouTube URL for timestamp extraction
+        on_progress: (Optional) callback(stage, progress) for job tracking
     
     Returns:
         dict with 'full_text' and 'timeline'
     """
     
+    report = on_progress or (lambda stage, progress: None)
+
     if not os.path.exists(audio_path):
         raise ValueError("Audio file not found")
 
@@ -80,20 +148,90 @@ def transcribe_audio(audio_path, youtube_url=None):
 
     # Step 1: Transcribe with Whisper (quality text)
     print("📝 Transcribing with Whisper...")
-    result = model.transcribe(
-        audio_path,
-        fp16=False,
-        language="en",
-        verbose=False,
-        condition_on_previous_text=False
-    )
+    report("transcribing", 0.3)
+    result = run_whisper(audio_path)
+
+    return build_transcript(result, youtube_url, report)
+
+
+def transcribe_stream(source, youtube_url=None, on_progress=None):
+    """
+    🌊 STREAMING: transcribe while the audio is still downloading
+
+    Args:
+        source: YouTube URL, or a local audio file standing in for it
+        youtube_url: (Optional) YouTube URL for timestamp extraction
+        on_progress: (Optional) callback(stage, progress) for job tracking
+
+    PCM chunks from stream_audio_pcm are transcribed as they arrive, each
+    with a few seconds of the previous chunk prepended, and stitched like
+    chunked transcription. Always uses the in-process model.
+
+    Returns:
+        dict with 'full_text' and 'timeline'
+    """
+    import numpy as np
+
+    from .audio import SAMPLE_RATE
+    from .chunked_transcriber import stitch_segments
+    from .youtube import stream_audio_pcm
+
+    report = on_progress or (lambda stage, progress: None)
+    chunk_seconds = getattr(settings, "WHISPER_STREAM_CHUNK_SECONDS", 25)
+    overlap_samples = int(getattr(settings, "WHISPER_CHUNK_OVERLAP", 5) * SAMPLE_RATE)
+
+    print("🌊 Streaming transcription with Whisper...")
+    report("transcribing", 0.3)
+    model = get_model()
+
+    windows, chunk_segments = [], []
+    tail = np.zeros(0, dtype=np.float32)
+    position = 0.0
+
+    for pcm in stream_audio_pcm(source, chunk_seconds=chunk_seconds):
+        audio = np.concatenate([tail, pcm])
+        start = position - len(tail) / SAMPLE_RATE
+
+        result = model.transcribe(audio, **WHISPER_OPTIONS)
+        chunk_segments.append([
+            {
+                "start": start + float(seg["start"]),
+                "end": start + float(seg["end"]),
+                "text": seg["text"],
+            }
+            for seg in result.get("segments", [])
+        ])
+        windows.append((start, start + len(audio) / SAMPLE_RATE))
+
+        position += len(pcm) / SAMPLE_RATE
+        tail = pcm[-overlap_samples:] if overlap_samples else tail[:0]
+
+    if not windows:
+        raise ValueError("No audio received")
+
+    segments = stitch_segments(windows, chunk_segments)
+    result = {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+    }
+
+    return build_transcript(result, youtube_url, report)
 
+
+def build_transcript(result, youtube_url=None, report=None):
+    """
+    Turn a Whisper result into the saved transcript dict
+    (YouTube timing when available, Whisper segments otherwise)
+    """
+    report = report or (lambda stage, progress: None)
     text = result.get("text", "").strip()
 
     if not text:
         raise ValueError("No speech detected")
 
     # Step 2: Try to get YouTube timestamps
+    report("aligning", 0.8)
+
     if youtube_url:
         print("⏰ Getting YouTube timestamps...")
         youtube_timestamps = get_youtube_timestamps(youtube_url)
@@ -129,45 +267,100 @@ def transcribe_audio(audio_path, youtube_url=None):
     }
 
 
+def _timeline_entry(yt_time, matching_text):
+    """
+    Combine matched Whisper text (or YouTube text as fallback) for one caption
+    """
+    if matching_text:
+        combined_text = " ".join(matching_text)
+    else:
+        combined_text = yt_time["youtube_text"]
+
+    # Clean up
+    combined_text = combined_text.replace('\n', ' ')
+    combined_text = re.sub(r'\s+', ' ', combined_text)
+
+    if not combined_text.strip():
+        return None
+
+    return {
+        "start": yt_time["start"],
+        "end": yt_time["end"],
+        "text": combined_text.strip()
+    }
+
+
+def _is_sorted_by_start(items):
+    return all(a["start"] <= b["start"] for a, b in zip(items, items[1:]))
+
+
+def _align_pairwise(whisper_segments, youtube_timestamps):
+    """
+    O(N·M) reference alignment, used when input is not sorted by start
+    """
+    timeline = []
+
+    for yt_time in youtube_timestamps:
+        matching_text = [
+            seg["text"].strip()
+            for seg in whisper_segments
+            if seg["start"] <= yt_time["end"] and seg["end"] >= yt_time["start"]
+        ]
+
+        entry = _timeline_entry(yt_time, matching_text)
+        if entry:
+            timeline.append(entry)
+
+    return timeline
+
+
 def align_whisper_to_youtube(whisper_result, youtube_timestamps):
     """
     Align Whisper text to YouTube timing
     Uses YouTube's perfect timestamps with Whisper's better text
+
+    Both lists are sorted by start time, so a sweep only looks at the
+    segments from the first one still running at a caption's start to
+    the last one starting before its end. For ordinary transcripts
+    (short, mostly disjoint segments) that is O(N + M + matches). A long
+    segment holds the window open, though: every segment after it is
+    rescanned by each caption it spans, so long or heavily overlapping
+    segments degrade to the pairwise O(N * M) in the worst case. Output
+    is identical to the pairwise scan, which is kept as a fallback for
+    unsorted input.
     """
     
     whisper_segments = whisper_result.get("segments", [])
+
+    if not (_is_sorted_by_start(whisper_segments)
+            and _is_sorted_by_start(youtube_timestamps)):
+        return _align_pairwise(whisper_segments, youtube_timestamps)
+
     timeline = []
-    
+    lo = 0
+    n = len(whisper_segments)
+
     for yt_time in youtube_timestamps:
         yt_start = yt_time["start"]
         yt_end = yt_time["end"]
-        
-        # Find overlapping Whisper segments
+
+        # Segments ending before this caption starts also end before every
+        # later caption (starts are non-decreasing), so drop them for good
+        while lo < n and whisper_segments[lo]["end"] < yt_start:
+            lo += 1
+
+        # Find overlapping Whisper segments; none past the first one that
+        # starts after the caption ends can overlap
         matching_text = []
-        
-        for seg in whisper_segments:
-            seg_start = seg["start"]
-            seg_end = seg["end"]
-            
-            # Check overlap
-            if (seg_start <= yt_end and seg_end >= yt_start):
+        i = lo
+        while i < n and whisper_segments[i]["start"] <= yt_end:
+            seg = whisper_segments[i]
+            if seg["end"] >= yt_start:
                 matching_text.append(seg["text"].strip())
-        
-        # Combine or use YouTube text as fallback
-        if matching_text:
-            combined_text = " ".join(matching_text)
-        else:
-            combined_text = yt_time["youtube_text"]
-        
-        # Clean up
-        combined_text = combined_text.replace('\n', ' ')
-        combined_text = re.sub(r'\s+', ' ', combined_text)
-        
-        if combined_text.strip():
-            timeline.append({
-                "start": yt_start,
-                "end": yt_end,
-                "text": combined_text.strip()
-            })
+            i += 1
+
+        entry = _timeline_entry(yt_time, matching_text)
+        if entry:
+            timeline.append(entry)
     
-    return timeline
\ No newline at end of file
+    return timeline
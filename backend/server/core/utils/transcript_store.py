@@ -0,0 +1,515 @@
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# ==================================================
+# PATHS + LIMITS
+# ==================================================
+TRANSCRIPT_DIR = Path(__file__).resolve().parent.parent / "data" / "transcripts"
+TRANSCRIPT_DIR.mkdir(parents=True, exist_ok=True)
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Used when a transcript has no timeline to index against
+WORDS_PER_SECOND = 2.5
+DEFAULT_PREVIEW_WORDS = 900
+
+# Words of full_text a segment word may be ahead of the running offset
+MATCH_LOOKAHEAD = 8
+
+
+# ==================================================
+# BINARY FORMAT
+# ==================================================
+# <video_id>.tbin:
+#   header   magic, version, segment count, meta bytes, full_text bytes
+#   records  SEGMENT_DTYPE x segment count, sorted by start
+#   meta     JSON of the remaining top-level keys (source, ...)
+#   blob     full_text, then every segment's text, UTF-8
+BINARY_MAGIC = b"TRNB"
+BINARY_VERSION = 1
+HEADER = struct.Struct("<4sIQQQ")
+
+# offset/length locate the segment's text in the blob
+SEGMENT_DTYPE = np.dtype([
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("offset", "<u4"),
+    ("length", "<u4"),
+])
+
+
+def _encode_segments(segments, base=0):
+    """
+    (records, encoded texts) for timeline segments, texts laid out from `base`
+    """
+    segments = sorted(segments, key=lambda seg: seg["start"])
+    texts = [seg["text"].encode("utf-8") for seg in segments]
+    lengths = np.array([len(t) for t in texts], dtype=np.int64)
+
+    records = np.zeros(len(segments), dtype=SEGMENT_DTYPE)
+    records["start"] = [seg["start"] for seg in segments]
+    records["end"] = [seg["end"] for seg in segments]
+    records["offset"] = base + np.cumsum(lengths) - lengths
+    records["length"] = lengths
+
+    return records, texts
+
+
+class Timeline(Sequence):
+    """
+    Read-only timeline over segment records and a text blob.
+
+    Both are views into one buffer (the memory-mapped .tbin file), so
+    slicing copies nothing; a segment's text is decoded only when that
+    segment is read.
+    """
+
+    def __init__(self, records, blob):
+        self.records = records
+        self.blob = blob
+
+    @classmethod
+    def from_segments(cls, segments):
+        records, texts = _encode_segments(segments)
+        return cls(records, memoryview(b"".join(texts)))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return Timeline(self.records[i], self.blob)
+
+        start, end, offset, length = self.records[i].tolist()
+        return {"start": start, "end": end, "text": str(self.blob[offset:offset + length], "utf-8")}
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    @property
+    def starts(self):
+        return self.records["start"]
+
+    @property
+    def ends(self):
+        return self.records["end"]
+
+    def between(self, start=None, end=None):
+        """
+        Segments overlapping [start, end) seconds (either bound optional)
+        """
+        lo, hi = 0, len(self)
+        if start is not None:
+            # Running max keeps ends sorted even when captions overlap
+            lo = int(np.searchsorted(np.maximum.accumulate(self.ends), start, side="right"))
+        if end is not None:
+            hi = int(np.searchsorted(self.starts, end, side="left"))
+        return self[lo:max(lo, hi)]
+
+
+def encode_transcript(data):
+    """
+    Transcript dict -> .tbin bytes
+    """
+    full_text = data.get("full_text", "").encode("utf-8")
+    meta = json.dumps({
+        k: v for k, v in data.items() if k not in ("full_text", "timeline")
+    }).encode("utf-8")
+    records, texts = _encode_segments(data.get("timeline", []), base=len(full_text))
+
+    header = HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(records), len(meta), len(full_text))
+    return b"".join([header, records.tobytes(), meta, full_text, *texts])
+
+
+def decode_transcript(video_id, buffer):
+    """
+    Transcript over a .tbin buffer (bytes or mmap); the timeline stays a
+    view into `buffer`
+    """
+    magic, version, n_segments, meta_len, text_len = HEADER.unpack_from(buffer)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"{video_id}: not a version {BINARY_VERSION} binary transcript")
+
+    records_end = HEADER.size + n_segments * SEGMENT_DTYPE.itemsize
+    records = np.frombuffer(buffer, dtype=SEGMENT_DTYPE, count=n_segments, offset=HEADER.size)
+    meta = json.loads(bytes(buffer[records_end:records_end + meta_len]))
+    blob = memoryview(buffer)[records_end + meta_len:]
+
+    full_text = str(blob[:text_len], "utf-8")
+    words = full_text.split()
+
+    return Transcript(
+        video_id=video_id,
+        full_text=full_text,
+        timeline=Timeline(records, blob),
+        words=words,
+        source=meta.get("source", "unknown"),
+        # Decoded text and word list; the mapped file itself lives in the page cache
+        size=text_len * 2 + len(words) * 8 + records.nbytes,
+    )
+
+
+@dataclass
+class Transcript:
+    """
+    Parsed transcript as held in the cache
+    """
+    video_id: str
+    full_text: str
+    timeline: list = field(default_factory=list)
+    words: list = field(default_factory=list)
+    source: str = "unknown"
+    size: int = 0
+    # Offset index: full_text[:offsets[i]] covers everything up to starts[i]
+    starts: list = field(default_factory=list)
+    offsets: list = field(default_factory=list)
+    preview_offset: int = 0
+    mtime: int = 0
+    # Artifacts built from this transcript (e.g. retrieval index), dropped with it
+    derived: dict = field(default_factory=dict, repr=False)
+
+    def as_dict(self):
+        return {
+            "full_text": self.full_text,
+            "timeline": list(self.timeline),
+            "source": self.source,
+        }
+
+    def offset_at(self, seconds):
+        """
+        Character offset into full_text covering everything up to `seconds`
+        """
+        i = bisect.bisect_right(self.starts, seconds)
+        return self.offsets[i - 1] if i else 0
+
+    def watched_offset(self, watched_seconds):
+        """
+        Character offset in full_text the student has watched up to
+        """
+        if not watched_seconds or watched_seconds <= 0:
+            return self.preview_offset
+
+        return self.offset_at(watched_seconds)
+
+    def watched_text(self, watched_seconds):
+        """
+        Transcript text the student has watched so far
+        """
+        return self.full_text[:self.watched_offset(watched_seconds)]
+
+
+# ==================================================
+# LRU CACHE
+# ==================================================
+class TranscriptCache:
+    """
+    In-process LRU keyed on (video_id, mtime), bounded by total bytes
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, transcript):
+        with self._lock:
+            # A new mtime for the same video makes older entries stale
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                self.total_bytes -= self._entries.pop(stale).size
+
+            if transcript.size > self.max_bytes:
+                return
+
+            self._entries[key] = transcript
+            self.total_bytes += transcript.size
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = TranscriptCache(
+    getattr(settings, "TRANSCRIPT_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)
+)
+
+
+# ==================================================
+# OFFSET INDEX
+# ==================================================
+def _normalize_token(token):
+    return re.sub(r"[^a-z0-9]", "", token.lower())
+
+
+def build_offset_index(full_text, timeline):
+    """
+    Map timeline segment starts to character offsets in full_text.
+
+    One running word offset walks full_text once: each segment word is
+    looked for within MATCH_LOOKAHEAD words ahead of it, so words
+    missing from either side only skip a little. Segments with no word
+    found (e.g. YouTube caption fallback text) are placed proportionally
+    to their end time.
+    """
+    spans = [m.span() for m in re.finditer(r"\S+", full_text)]
+    tokens = [_normalize_token(full_text[a:b]) for a, b in spans]
+    ends = [b for _, b in spans]
+
+    preview = min(DEFAULT_PREVIEW_WORDS, len(ends))
+    preview_offset = ends[preview - 1] if preview else 0
+
+    if not timeline:
+        # Legacy transcripts: fall back to a fixed speaking rate
+        return {
+            "starts": [(i + 1) / WORDS_PER_SECOND for i in range(len(ends))],
+            "offsets": ends,
+            "preview_offset": preview_offset,
+        }
+
+    duration = max(seg["end"] for seg in timeline) or 1.0
+    starts, offsets = [], []
+    cursor = 0
+
+    for seg in timeline:
+        matched = False
+
+        for token in map(_normalize_token, seg["text"].split()):
+            if not token:
+                continue
+            for i in range(cursor, min(cursor + MATCH_LOOKAHEAD, len(tokens))):
+                if tokens[i] == token:
+                    cursor, matched = i + 1, True
+                    break
+
+        if not matched:
+            cursor = max(cursor, min(int(len(tokens) * seg["end"] / duration), len(tokens)))
+
+        starts.append(seg["start"])
+        offsets.append(ends[cursor - 1] if cursor else 0)
+
+    return {
+        "starts": starts,
+        "offsets": offsets,
+        "preview_offset": preview_offset,
+    }
+
+
+# ==================================================
+# PUBLIC API
+# ==================================================
+def artifact_path(video_id, suffix):
+    """
+    Path of a file stored next to the transcript (index, cache, ...)
+    """
+    return TRANSCRIPT_DIR / f"{video_id}{suffix}"
+
+
+def transcript_path(video_id):
+    """
+    Legacy JSON / plain-text transcript (see migrate_transcripts)
+    """
+    return artifact_path(video_id, ".txt")
+
+
+def binary_path(video_id):
+    return artifact_path(video_id, ".tbin")
+
+
+def index_path(video_id):
+    return artifact_path(video_id, ".idx.json")
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write via a temp file + rename so readers never see a partial file
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def atomic_write_text(path, text):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def transcript_exists(video_id):
+    return binary_path(video_id).exists() or transcript_path(video_id).exists()
+
+
+def _stored_file(video_id):
+    """
+    (path, mtime) of the transcript on disk, binary preferred, or (None, None)
+    """
+    for path in (binary_path(video_id), transcript_path(video_id)):
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return None, None
+
+
+def parse_transcript(video_id, content):
+    """
+    Accepts both the JSON format and legacy plain-text transcripts
+    """
+    if content.strip().startswith("{"):
+        data = json.loads(content)
+    else:
+        data = {"full_text": content}
+
+    full_text = data.get("full_text", "")
+    words = full_text.split()
+
+    return Transcript(
+        video_id=video_id,
+        full_text=full_text,
+        timeline=Timeline.from_segments(data.get("timeline", [])),
+        words=words,
+        source=data.get("source", "unknown"),
+        # Rough in-memory footprint: raw text plus the word list
+        size=len(content.encode("utf-8")) * 2 + len(words) * 8,
+    )
+
+
+def read_offset_index(video_id, mtime):
+    """
+    The persisted offset index, or None if missing or built for another
+    version of the transcript
+    """
+    try:
+        index = json.loads(index_path(video_id).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+    return index if index.get("transcript_mtime") == mtime else None
+
+
+def write_offset_index(video_id, full_text, timeline, mtime):
+    index = build_offset_index(full_text, timeline)
+    index["transcript_mtime"] = mtime
+    atomic_write_text(index_path(video_id), json.dumps(index))
+    return index
+
+
+def _load_index(video_id, transcript, mtime):
+    """
+    Attach the offset index. Reads never write it: a missing or stale
+    index is built in memory until migrate_transcripts persists it.
+    """
+    index = read_offset_index(video_id, mtime)
+    if index is None:
+        index = build_offset_index(transcript.full_text, transcript.timeline)
+
+    transcript.starts = index["starts"]
+    transcript.offsets = index["offsets"]
+    transcript.preview_offset = index["preview_offset"]
+    transcript.size += len(transcript.offsets) * 16
+
+
+def save_transcript(video_id, data):
+    """
+    Atomically write a binary transcript and its offset index
+    """
+    path = binary_path(video_id)
+    atomic_write_bytes(path, encode_transcript(data))
+
+    # The binary file supersedes any legacy one
+    transcript_path(video_id).unlink(missing_ok=True)
+
+    write_offset_index(
+        video_id,
+        data.get("full_text", ""),
+        Timeline.from_segments(data.get("timeline", [])),
+        os.stat(path).st_mtime_ns,
+    )
+
+
+def read_transcript_file(video_id, path):
+    """
+    Parse a transcript file: binary files are memory-mapped, legacy ones read
+    """
+    if path.suffix == ".tbin":
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return decode_transcript(video_id, buffer)
+
+    return parse_transcript(video_id, path.read_text(encoding="utf-8"))
+
+
+def load_transcript(video_id):
+    """
+    Return the cached Transcript for video_id, or None if it does not exist
+    """
+    path, mtime = _stored_file(video_id)
+    if path is None:
+        return None
+
+    key = (video_id, mtime)
+    transcript = _cache.get(key)
+    if transcript is not None:
+        return transcript
+
+    transcript = read_transcript_file(video_id, path)
+    transcript.mtime = mtime
+    _load_index(video_id, transcript, mtime)
+    _cache.put(key, transcript)
+
+    return transcript
+
+
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,71 @@
+"""
+Lecture vocabulary for the chatbot grounding check.
+
+A Vocabulary is the set of stemmed, stop-word-filtered content tokens of
+a text plus its adjacent token pairs. The whole-lecture vocabulary is
+built once per transcript (kept in Transcript.derived); answers are
+scored by how much of their own vocabulary the source text covers.
+"""
+
+import re
+from dataclasses import dataclass
+
+from .retrieval import STOP_WORDS
+
+# Longest first; a suffix is only removed if 3+ characters remain
+_SUFFIXES = ("ings", "ing", "ies", "ied", "ed", "es", "ly", "s")
+
+
+def stem(token):
+    """
+    Crude suffix stripping: "changes", "changed", "changing" -> "chang"
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)] + ("y" if suffix in ("ies", "ied") else "")
+            break
+
+    if len(token) > 4 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def content_tokens(text):
+    return [stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class Vocabulary:
+    tokens: frozenset
+    pairs: frozenset
+
+    @classmethod
+    def from_text(cls, text):
+        tokens = content_tokens(text)
+        return cls(frozenset(tokens), frozenset(zip(tokens, tokens[1:])))
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def coverage(self, text):
+        """
+        (share of text's distinct tokens, share of its token pairs) found
+        in this vocabulary
+        """
+        answer = Vocabulary.from_text(text)
+        if not answer.tokens:
+            return 0.0, 0.0
+
+        token_share = len(answer.tokens & self.tokens) / len(answer.tokens)
+        pair_share = len(answer.pairs & self.pairs) / len(answer.pairs) if answer.pairs else token_share
+        return token_share, pair_share
+
+
+def get_vocabulary(transcript):
+    """
+    Whole-lecture Vocabulary of a Transcript, built on first use
+    """
+    vocabulary = transcript.derived.get("vocabulary")
+    if vocabulary is None:
+        vocabulary = transcript.derived["vocabulary"] = Vocabulary.from_text(transcript.full_text)
+    return vocabulary
@@ -0,0 +1,114 @@
+"""
+Long-lived Whisper model server.
+
+One process holds the model in memory and serves transcription
+requests over a Unix socket, so web and job workers do not each keep
+their own copy. Start it with `python manage.py run_whisper_server`
+and set WHISPER_SERVER_SOCKET to the same path.
+
+Wire format: 4-byte big-endian length prefix + UTF-8 JSON, both ways.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+
+HEADER = struct.Struct(">I")
+
+
+# ==================================================
+# FRAMING
+# ==================================================
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Whisper server closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_message(sock, payload):
+    body = json.dumps(payload).encode("utf-8")
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def recv_message(sock):
+    (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+def _slim_result(result):
+    """
+    Keep only what transcribe_audio uses, so the reply is plain JSON
+    """
+    return {
+        "text": result.get("text", ""),
+        "segments": [
+            {
+                "start": float(seg["start"]),
+                "end": float(seg["end"]),
+                "text": seg["text"],
+            }
+            for seg in result.get("segments", [])
+        ],
+    }
+
+
+# ==================================================
+# CLIENT
+# ==================================================
+def transcribe_remote(socket_path, audio_path, options):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_message(sock, {"audio_path": audio_path, "options": options})
+        reply = recv_message(sock)
+
+    if "error" in reply:
+        raise RuntimeError(f"Whisper server error: {reply['error']}")
+
+    return reply["result"]
+
+
+# ==================================================
+# SERVER
+# ==================================================
+class WhisperRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+            result = self.server.model.transcribe(
+                request["audio_path"],
+                **request.get("options", {})
+            )
+            send_message(self.request, {"result": _slim_result(result)})
+
+        except ConnectionError:
+            return
+
+        except Exception as e:
+            print(f"❌ Whisper server error: {e}")
+            send_message(self.request, {"error": str(e)})
+
+
+class WhisperServer(socketserver.UnixStreamServer):
+    """
+    Requests are handled one at a time: the model is not thread-safe
+    and a single transcription already saturates the CPU/GPU
+    """
+
+    def __init__(self, socket_path, model):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        self.model = model
+        super().__init__(socket_path, WhisperRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
@@ -1,7 +1,25 @@
 import subprocess
+import threading
+import queue
 import uuid
 import os
 
+import numpy as np
+
+from .audio import SAMPLE_RATE
+
+# PCM chunks read ahead of the transcriber (~100 s of audio at 25 s chunks)
+STREAM_QUEUE_CHUNKS = 4
+
+# 🔥 Anti-403 fixes
+YTDLP_NETWORK_ARGS = [
+    "--user-agent", "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
+    "--referer", "https://www.youtube.com/",
+    "--force-ipv4",
+    "--no-playlist",
+]
+
+
 def download_audio(youtube_url):
     file_id = str(uuid.uuid4())
     output_template = f"/tmp/{file_id}.%(ext)s"
@@ -14,11 +32,7 @@ def download_audio(youtube_url):
         "--audio-format", "mp3",
         "--audio-quality", "192K",
 
-        # 🔥 Anti-403 fixes
-        "--user-agent", "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
-        "--referer", "https://www.youtube.com/",
-        "--force-ipv4",
-        "--no-playlist",
+        *YTDLP_NETWORK_ARGS,
 
         "-o", output_template,
         youtube_url
@@ -30,3 +44,90 @@ def download_audio(youtube_url):
         raise ValueError("Downloaded audio is invalid")
 
     return final_path
+
+
+def stream_audio_pcm(source, chunk_seconds=25):
+    """
+    Yield 16 kHz mono float32 PCM chunks while the audio is still arriving.
+
+    `source` is a YouTube URL (yt-dlp pipes the best audio stream into
+    ffmpeg, no mp3 re-encode, nothing written to disk) or a local audio
+    file, which stands in for the remote source in tests. A reader thread
+    drains ffmpeg so the download keeps going while chunks are being
+    transcribed, up to STREAM_QUEUE_CHUNKS chunks ahead; then it blocks
+    and the pipes apply backpressure to ffmpeg and yt-dlp. Both
+    subprocesses are always reaped on exit.
+    """
+    ffmpeg_output = ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+    processes = []
+    stopped = threading.Event()
+
+    try:
+        if os.path.exists(source):
+            ffmpeg = subprocess.Popen(
+                ["ffmpeg", "-nostdin", "-v", "error", "-i", source, *ffmpeg_output],
+                stdout=subprocess.PIPE,
+            )
+        else:
+            ytdlp = subprocess.Popen(
+                ["yt-dlp", "-f", "bestaudio/best", *YTDLP_NETWORK_ARGS, "-o", "-", source],
+                stdout=subprocess.PIPE,
+            )
+            processes.append(ytdlp)
+            ffmpeg = subprocess.Popen(
+                ["ffmpeg", "-v", "error", "-i", "pipe:0", *ffmpeg_output],
+                stdin=ytdlp.stdout,
+                stdout=subprocess.PIPE,
+            )
+            # ffmpeg owns the read end now; lets yt-dlp see SIGPIPE if ffmpeg dies
+            ytdlp.stdout.close()
+
+        processes.append(ffmpeg)
+
+        chunk_bytes = int(chunk_seconds * SAMPLE_RATE) * 2
+        chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+
+        def put(item):
+            # Blocks while the queue is full; gives up once the consumer is gone
+            while not stopped.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def reader():
+            try:
+                while True:
+                    data = ffmpeg.stdout.read(chunk_bytes)
+                    if not data or not put(data):
+                        break
+            finally:
+                put(None)
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+
+        while True:
+            data = chunks.get()
+            if data is None:
+                break
+            # Drop a trailing odd byte rather than fail on a torn sample
+            data = data[:len(data) - len(data) % 2]
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+        thread.join()
+
+        for process in processes:
+            if process.wait() != 0:
+                raise ValueError(f"Audio stream failed ({process.args[0]} exited {process.returncode})")
+
+    finally:
+        stopped.set()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            if process.stdout:
+                process.stdout.close()
@@ -1,23 +1,51 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-import re
+import base64
+import binascii
 import json
-from pathlib import Path
+import math
+import re
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-from .utils.youtube import download_audio
-from .utils.transcriber import transcribe_audio  # ← NO CHANGE, same import!
+from .jobs import enqueue_transcription
+from .attempts import get_attempt, increase_attempt
+from .progress import advance_quiz, get_progress, quiz_start_offset, stream_watched_notes, watched_notes
+from .models import TranscriptionJob
+from .question_bank import request_top_up, sample_quiz
 from .utils.quiz_generator import generate_quiz
-from .utils.notes_generator import generate_notes
-from .utils.chatbot import answer_from_transcript
+from .utils.notes_generator import generate_notes, stream_notes
+from .utils.engagement import engagement_timeline, record_samples
+from .utils.chatbot import (
+    NOT_COVERED,
+    answer_from_transcript,
+    is_summary_request,
+    stream_answer,
+)
+from .utils.llm_cache import cache_stats as llm_cache_stats
+from .utils.llm_gateway import gateway_stats
+from .utils.embeddings import (
+    EmbeddingModelUnavailable,
+    hybrid_search,
+    is_summary_intent,
+    search_lectures,
+)
+from .utils.search_index import search as search_transcripts
+from .utils.vocabulary import get_vocabulary
+from .utils.transcript_store import (
+    cache_stats,
+    load_transcript,
+    transcript_exists,
+)
 
 from .constants import LECTURE_VIDEOS
 
 
-# ================= PATH SETUP =================
-BASE_DIR = Path(__file__).resolve().parent
-TRANSCRIPT_DIR = BASE_DIR / "data" / "transcripts"
-TRANSCRIPT_DIR.mkdir(parents=True, exist_ok=True)
+TRANSCRIPT_PAGE_LIMIT = 500
 
 
 # ================= HELPERS =================
@@ -34,16 +62,67 @@ def extract_video_id(url):
     return None
 
 
-def get_partial_transcript(full_transcript, watched_seconds):
+def parse_watched_seconds(value):
+    """
+    Seconds watched from client input; 0 if malformed, negative or not
+    finite (inf would unlock the whole transcript)
+    """
+    try:
+        seconds = float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+    return seconds if math.isfinite(seconds) and seconds >= 0 else 0
+
+
+def parse_optional_number(value, cast=float):
+    """
+    Query param -> number, None if absent; ValueError if malformed
+    """
+    if value in (None, ""):
+        return None
+    number = cast(value)
+    if not math.isfinite(number):
+        raise ValueError("must be finite")
+    if number < 0:
+        raise ValueError("must not be negative")
+    return number
+
+
+def notes_source(transcript, watched_seconds, mode):
     """
-    Return transcript text based on watched duration
+    (offset in full_text, title) the notes for `mode` cover
     """
-    if not watched_seconds or watched_seconds <= 0:
-        return " ".join(full_transcript.split()[:900])
+    if mode == "watched":
+        return transcript.watched_offset(parse_watched_seconds(watched_seconds)), "Watched Notes"
+    return len(transcript.full_text), "Full Lecture Notes"
 
-    words_per_second = 2.5
-    max_words = int(watched_seconds * words_per_second)
-    return " ".join(full_transcript.split()[:max_words])
+
+def wants_summary(question):
+    # Meaning-based when an embedding model is installed; keywords catch the rest
+    return is_summary_request(question) or bool(is_summary_intent(question))
+
+
+def chat_chunks(transcript, question, summary):
+    # Summaries need the whole lecture; questions only the best passages
+    return [] if summary else hybrid_search(transcript, question)
+
+
+def chat_sources(chunks):
+    return [
+        {"start": c["start"], "end": c["end"]}
+        for c in sorted(chunks, key=lambda c: c["start"])
+    ]
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+    return response
 
 
 # ================= API ENDPOINTS =================
@@ -63,38 +142,28 @@ def submit_video(request):
 
     youtube_url = LECTURE_VIDEOS[lecture_id]["url"]
     video_id = extract_video_id(youtube_url)
-    transcript_path = TRANSCRIPT_DIR / f"{video_id}.txt"
 
     try:
-        if transcript_path.exists():
+        if transcript_exists(video_id):
             return Response({
                 "status": "success",
                 "video_id": video_id,
                 "message": "Transcript already exists"
             })
 
-        # Download audio
-        audio_path = download_audio(youtube_url)
-        
-        # 🔥 CHANGED: Pass youtube_url to transcribe_audio
-        print(f"Processing: {youtube_url}")
-        data = transcribe_audio(audio_path, youtube_url=youtube_url)
-        
-        print(f"✅ Method: {data.get('source', 'unknown')}")
-        print(f"✅ Segments: {len(data.get('timeline', []))}")
-
-        # Save transcript
-        transcript_path.write_text(
-            json.dumps(data, indent=2),
-            encoding="utf-8"
-        )
+        # Download + transcription run in the background worker pool
+        print(f"Queueing: {youtube_url}")
+        job, created = enqueue_transcription(video_id, youtube_url)
 
         return Response({
-            "status": "success",
+            "status": "queued",
             "video_id": video_id,
-            "message": "Transcript generated",
-            "method": data.get('source', 'unknown')
-        })
+            "job_id": str(job.pk),
+            "message": (
+                "Transcription queued" if created
+                else "Transcription already in progress"
+            )
+        }, status=202)
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -105,19 +174,49 @@ def submit_video(request):
 
 # ------------------------------------------------
 @api_view(["GET"])
-def get_transcript(request, video_id):
-    transcript_path = TRANSCRIPT_DIR / f"{video_id}.txt"
+def get_job_status(request, job_id):
+    try:
+        job = TranscriptionJob.objects.get(pk=job_id)
+    except TranscriptionJob.DoesNotExist:
+        return Response({"error": "Job not found"}, status=404)
+
+    return Response(job.as_dict())
 
-    if not transcript_path.exists():
-        return Response({"error": "Transcript not found"}, status=404)
 
+# ------------------------------------------------
+@api_view(["GET"])
+def get_transcript(request, video_id):
     try:
-        content = transcript_path.read_text(encoding="utf-8")
+        transcript = load_transcript(video_id)
 
-        if content.strip().startswith("{"):
-            return Response(json.loads(content))
+        if transcript is None:
+            return Response({"error": "Transcript not found"}, status=404)
 
-        return Response({"full_text": content})
+        params = request.query_params
+        if not any(k in params for k in ("start", "end", "offset", "limit")):
+            return Response(transcript.as_dict())
+
+        # Range / page of the timeline only, sliced straight out of the transcript file
+        try:
+            start = parse_optional_number(params.get("start"))
+            end = parse_optional_number(params.get("end"))
+            offset = parse_optional_number(params.get("offset"), int) or 0
+            limit = parse_optional_number(params.get("limit"), int)
+        except ValueError:
+            return Response({"error": "start/end/offset/limit must be non-negative numbers"}, status=400)
+
+        limit = min(limit or TRANSCRIPT_PAGE_LIMIT, TRANSCRIPT_PAGE_LIMIT)
+        segments = transcript.timeline.between(start, end)
+        page = segments[offset:offset + limit]
+
+        return Response({
+            "timeline": list(page),
+            "source": transcript.source,
+            "total": len(segments),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < len(segments) else None,
+        })
 
     except Exception as e:
         return Response({"error": str(e)}, status=500)
@@ -128,24 +227,35 @@ def get_transcript(request, video_id):
 def generate_quiz_view(request):
     video_id = request.data.get("video_id")
     watched_seconds = request.data.get("watched_seconds", 0)
+    student_id = str(request.data.get("student_id") or "")[:64]
 
     if not video_id:
         return Response({"error": "Video ID required"}, status=400)
 
-    transcript_path = TRANSCRIPT_DIR / f"{video_id}.txt"
-    if not transcript_path.exists():
-        return Response({"error": "Transcript not found"}, status=400)
-
     try:
-        content = transcript_path.read_text(encoding="utf-8")
+        transcript = load_transcript(video_id)
+        if transcript is None:
+            return Response({"error": "Transcript not found"}, status=400)
 
-        if content.strip().startswith("{"):
-            full_text = json.loads(content).get("full_text", "")
-        else:
-            full_text = content
+        attempt = get_attempt(video_id, student_id)
+        watched_offset = transcript.watched_offset(parse_watched_seconds(watched_seconds))
+
+        # Known students get questions from what they watched since their last quiz
+        progress = get_progress(transcript, student_id) if student_id else None
+        from_offset = quiz_start_offset(transcript, progress, watched_offset) if progress else 0
 
-        partial_text = get_partial_transcript(full_text, watched_seconds)
-        quiz = generate_quiz(partial_text, video_id)
+        # Banked questions from that range; live generation only as fallback
+        quiz = sample_quiz(video_id, watched_offset, attempt=attempt, from_offset=from_offset)
+
+        if not quiz:
+            quiz = generate_quiz(transcript.full_text[from_offset:watched_offset], attempt=attempt)
+
+        request_top_up(video_id, watched_offset, attempt=attempt, from_offset=from_offset)
+
+        if quiz:
+            increase_attempt(video_id, student_id)
+            if progress:
+                advance_quiz(progress, watched_offset)
 
         if not quiz:
             return Response({"error": "Quiz generation failed"}, status=500)
@@ -166,33 +276,22 @@ def generate_notes_view(request):
     video_id = request.data.get("video_id")
     watched_seconds = request.data.get("watched_seconds", 0)
     mode = request.data.get("mode", "watched")  # watched | full
+    student_id = str(request.data.get("student_id") or "")[:64]
 
     if not video_id:
         return Response({"error": "Video ID required"}, status=400)
 
-    transcript_path = TRANSCRIPT_DIR / f"{video_id}.txt"
-    if not transcript_path.exists():
-        return Response({"error": "Transcript not found"}, status=400)
-
     try:
-        content = transcript_path.read_text(encoding="utf-8")
+        transcript = load_transcript(video_id)
+        if transcript is None:
+            return Response({"error": "Transcript not found"}, status=400)
 
-        if content.strip().startswith("{"):
-            full_text = json.loads(content).get("full_text", "")
-        else:
-            full_text = content
+        upto_offset, title = notes_source(transcript, watched_seconds, mode)
 
-        source_text = (
-            get_partial_transcript(full_text, watched_seconds)
-            if mode == "watched"
-            else full_text
-        )
-
-        notes = generate_notes(
-            source_text,
-            title="Watched Notes" if mode == "watched" else "Full Lecture Notes",
-            mode=mode
-        )
+        if mode == "watched" and student_id:
+            notes = watched_notes(transcript, student_id, upto_offset)
+        else:
+            notes = generate_notes(transcript, upto_offset, title=title, mode=mode)
 
         return Response({
             "status": "success",
@@ -217,25 +316,352 @@ def chatbot_view(request):
             status=400
         )
 
-    transcript_path = TRANSCRIPT_DIR / f"{video_id}.txt"
-    if not transcript_path.exists():
-        return Response({"error": "Transcript not found"}, status=404)
-
     try:
-        content = transcript_path.read_text(encoding="utf-8")
+        transcript = load_transcript(video_id)
+        if transcript is None:
+            return Response({"error": "Transcript not found"}, status=404)
 
-        if content.strip().startswith("{"):
-            full_text = json.loads(content).get("full_text", "")
-        else:
-            full_text = content
+        summary = wants_summary(question)
+        chunks = chat_chunks(transcript, question, summary)
+
+        answer = answer_from_transcript(
+            transcript.full_text, question, chunks=chunks,
+            vocabulary=get_vocabulary(transcript), summary=summary,
+        )
 
-        answer = answer_from_transcript(full_text, question)
+        sources = [] if answer == NOT_COVERED else chat_sources(chunks)
 
         return Response({
             "status": "success",
-            "answer": answer
+            "answer": answer,
+            "sources": sources
         })
 
     except Exception as e:
         print("CHATBOT ERROR >>>", e)
-        return Response({"error": str(e)}, status=500)
\ No newline at end of file
+        return Response({"error": str(e)}, status=500)
+
+
+# ================= STREAMING (SSE) =================
+# Async views: run under ASGI (server/asgi.py) so tokens are flushed as they
+# arrive and a client disconnect cancels the generator, closing the Groq call.
+
+def parse_json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+@csrf_exempt
+@require_POST
+async def chatbot_stream_view(request):
+    """
+    Events: token {text}*, then done {sources} | abort {answer} | error {error}.
+    On abort the client replaces what it has shown with `answer`.
+    """
+    data = parse_json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    video_id = data.get("video_id")
+    question = data.get("question")
+
+    if not video_id or not question:
+        return JsonResponse({"error": "video_id and question required"}, status=400)
+
+    try:
+        transcript = await sync_to_async(load_transcript)(video_id)
+        if transcript is None:
+            return JsonResponse({"error": "Transcript not found"}, status=404)
+
+        summary = await sync_to_async(wants_summary)(question)
+        chunks = await sync_to_async(chat_chunks)(transcript, question, summary)
+        vocabulary = await sync_to_async(get_vocabulary)(transcript)
+
+    except Exception as e:
+        print("CHATBOT STREAM ERROR >>>", e)
+        return JsonResponse({"error": str(e)}, status=500)
+
+    async def events():
+        try:
+            answer = stream_answer(
+                transcript.full_text, question, chunks=chunks, vocabulary=vocabulary, summary=summary
+            )
+            async for kind, text in answer:
+                if kind == "token":
+                    yield sse_event("token", {"text": text})
+                elif kind == "abort":
+                    yield sse_event("abort", {"answer": text})
+                else:
+                    yield sse_event("done", {"sources": chat_sources(chunks)})
+
+        except Exception as e:
+            print("CHATBOT STREAM ERROR >>>", e)
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
+
+# ------------------------------------------------
+@csrf_exempt
+@require_POST
+async def generate_notes_stream_view(request):
+    """
+    Events: token {text}*, then done {mode} | error {error}
+    """
+    data = parse_json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    video_id = data.get("video_id")
+    watched_seconds = data.get("watched_seconds", 0)
+    mode = data.get("mode", "watched")  # watched | full
+    student_id = str(data.get("student_id") or "")[:64]
+
+    if not video_id:
+        return JsonResponse({"error": "Video ID required"}, status=400)
+
+    try:
+        transcript = await sync_to_async(load_transcript)(video_id)
+        if transcript is None:
+            return JsonResponse({"error": "Transcript not found"}, status=400)
+
+        upto_offset, title = notes_source(transcript, watched_seconds, mode)
+
+    except Exception as e:
+        print("NOTES STREAM ERROR >>>", e)
+        return JsonResponse({"error": str(e)}, status=500)
+
+    if mode == "watched" and student_id:
+        notes = stream_watched_notes(transcript, student_id, upto_offset)
+    else:
+        notes = stream_notes(transcript, upto_offset, title=title, mode=mode)
+
+    async def events():
+        try:
+            async for text in notes:
+                yield sse_event("token", {"text": text})
+            yield sse_event("done", {"mode": mode})
+
+        except Exception as e:
+            print("NOTES STREAM ERROR >>>", e)
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
+
+# ------------------------------------------------
+@api_view(["GET"])
+def get_cache_stats(request):
+    return Response({
+        "transcripts": cache_stats(),
+        "llm": llm_cache_stats()
+    })
+
+
+# ------------------------------------------------
+@api_view(["GET"])
+def get_llm_stats(request):
+    return Response(gateway_stats())
+
+
+# ================= EMOTION =================
+def read_frame(request):
+    """
+    Encoded frame bytes from a multipart "frame" file or a base64 /
+    data-URL "frame" field, or None
+    """
+    upload = request.FILES.get("frame")
+    if upload is not None:
+        return upload.read()
+
+    frame = request.data.get("frame")
+    if not isinstance(frame, str):
+        return None
+
+    try:
+        return base64.b64decode(frame.split(",", 1)[-1], validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+@api_view(["POST"])
+def emotion_view(request):
+    video_time = request.data.get("video_time")
+    if video_time not in (None, ""):
+        try:
+            video_time = float(video_time)
+        except (TypeError, ValueError):
+            video_time = math.nan
+        if not math.isfinite(video_time) or video_time < 0:
+            return Response({"error": "video_time must be a non-negative number of seconds"}, status=400)
+    else:
+        video_time = None
+
+    # OpenCV / TensorFlow are optional: only this endpoint needs them
+    try:
+        from .utils.emotion.batcher import BatcherBusy
+        from .utils.emotion.model_loader import EmotionModelUnavailable
+        from .utils.emotion.predictor import decode_frame, predict_emotion_batched
+    except ImportError as e:
+        return Response({"error": f"Emotion detection unavailable: {e}"}, status=503)
+
+    data = read_frame(request)
+    if not data:
+        return Response({"error": "frame required"}, status=400)
+
+    image = decode_frame(data)
+    if image is None:
+        return Response({"error": "Could not decode frame"}, status=400)
+
+    try:
+        session_id = request.data.get("session_id") or request.data.get("student_id")
+        result = predict_emotion_batched(image, session_id=session_id, timeout=5)
+
+        # Frames sent with the lecture position also feed the engagement timeline
+        video_id = request.data.get("video_id")
+        if session_id and video_id and video_time is not None and transcript_exists(video_id):
+            record_samples(video_id, session_id, [
+                (video_time, result["emotion"], result["confidence"])
+            ])
+
+        return Response(result)
+
+    except EmotionModelUnavailable as e:
+        return Response({"error": str(e)}, status=503)
+
+    except BatcherBusy:
+        return Response({"error": "Emotion detection busy, try again"}, status=503)
+
+    except Exception as e:
+        print("EMOTION ERROR >>>", e)
+        return Response({"error": str(e)}, status=500)
+
+
+# ------------------------------------------------
+@api_view(["GET"])
+def get_emotion_stats(request):
+    try:
+        from .utils.emotion.batcher import batcher_stats
+        from .utils.emotion.tracker import tracker_stats
+    except ImportError as e:
+        return Response({"error": f"Emotion detection unavailable: {e}"}, status=503)
+
+    return Response({"batcher": batcher_stats(), "tracker": tracker_stats()})
+
+
+# ================= ENGAGEMENT =================
+@api_view(["POST"])
+def record_engagement(request):
+    """
+    {video_id, session_id, samples: [{t, emotion, confidence}, ...]}
+    """
+    video_id = request.data.get("video_id")
+    session_id = request.data.get("session_id")
+    samples = request.data.get("samples")
+
+    if not video_id or not session_id or not isinstance(samples, list):
+        return Response({"error": "video_id, session_id and samples required"}, status=400)
+
+    if not transcript_exists(video_id):
+        return Response({"error": "Transcript not found"}, status=404)
+
+    try:
+        recorded = record_samples(video_id, session_id, [
+            (s["t"], s["emotion"], s.get("confidence", 1.0)) for s in samples
+        ])
+    except (KeyError, TypeError, ValueError):
+        return Response({"error": "Each sample needs t and emotion"}, status=400)
+
+    return Response({"status": "success", "recorded": recorded})
+
+
+# ------------------------------------------------
+@api_view(["GET"])
+def get_engagement(request, video_id):
+    try:
+        transcript = load_transcript(video_id)
+        if transcript is None:
+            return Response({"error": "Transcript not found"}, status=404)
+
+        return Response(engagement_timeline(transcript))
+
+    except Exception as e:
+        print("ENGAGEMENT ERROR >>>", e)
+        return Response({"error": str(e)}, status=500)
+
+
+# ================= SEARCH =================
+def result_count(value, maximum):
+    """
+    A ?k= value clamped to 1..maximum, or None if it is not an integer
+    """
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max(k, 1), maximum)
+
+
+@api_view(["GET"])
+def semantic_search_view(request):
+    """
+    ?q=...&k=10 -> passages from every transcribed lecture, best first
+    """
+    query = (request.query_params.get("q") or "").strip()
+    if not query:
+        return Response({"error": "q required"}, status=400)
+
+    k = result_count(request.query_params.get("k", 10), 50)
+    if k is None:
+        return Response({"error": "k must be an integer"}, status=400)
+
+    # Lectures that have a transcript, keyed by YouTube id
+    lectures = {extract_video_id(info["url"]): (lecture_id, info) for lecture_id, info in LECTURE_VIDEOS.items()}
+
+    try:
+        transcripts = [t for t in map(load_transcript, lectures) if t is not None]
+        results = search_lectures(transcripts, query, k=k)
+
+    except EmbeddingModelUnavailable as e:
+        return Response({"error": f"Semantic search unavailable: {e}"}, status=503)
+
+    except Exception as e:
+        print("SEARCH ERROR >>>", e)
+        return Response({"error": str(e)}, status=500)
+
+    for result in results:
+        lecture_id, info = lectures[result["video_id"]]
+        result.update(lecture_id=lecture_id, title=info["title"])
+
+    return Response({"query": query, "results": results})
+
+
+@api_view(["GET"])
+def search_view(request):
+    """
+    ?q=...&k=20[&video_id=...] -> full-text hits in every transcript, best
+    first, with a <mark>-highlighted snippet
+    """
+    query = (request.query_params.get("q") or "").strip()
+    if not query:
+        return Response({"error": "q required"}, status=400)
+
+    k = result_count(request.query_params.get("k", 20), 100)
+    if k is None:
+        return Response({"error": "k must be an integer"}, status=400)
+
+    try:
+        results = search_transcripts(query, k=k, video_id=request.query_params.get("video_id"))
+
+    except Exception as e:
+        print("SEARCH ERROR >>>", e)
+        return Response({"error": str(e)}, status=500)
+
+    lectures = {extract_video_id(info["url"]): (lecture_id, info) for lecture_id, info in LECTURE_VIDEOS.items()}
+    for result in results:
+        lecture_id, info = lectures.get(result["video_id"], (None, {}))
+        result.update(lecture_id=lecture_id, title=info.get("title"))
+
+    return Response({"query": query, "results": results})
@@ -3,6 +3,10 @@ ASGI config for server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. ``uvicorn server.asgi:application``) for
+the streaming chatbot/notes endpoints: under WSGI their responses are
+buffered and client disconnects are not noticed.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
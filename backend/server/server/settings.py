@@ -127,3 +127,108 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Transcript cache
+# Upper bound on parsed transcripts kept in memory per process
+
+TRANSCRIPT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Transcription jobs
+# Size of the process pool running download + Whisper; 0 runs jobs inline
+
+TRANSCRIPTION_WORKERS = 2
+TRANSCRIPTION_DOWNLOADER = 'core.utils.youtube.download_audio'
+
+# Pipe yt-dlp straight into ffmpeg/Whisper instead of downloading an mp3 first
+TRANSCRIPTION_STREAMING = False
+WHISPER_STREAM_CHUNK_SECONDS = 25
+
+# Whisper
+# The model is loaded lazily on first transcription. Set WHISPER_SERVER_SOCKET
+# (and run `manage.py run_whisper_server`) to keep a single shared model copy.
+
+WHISPER_MODEL_SIZE = 'tiny'
+WHISPER_DEVICE = None
+WHISPER_SERVER_SOCKET = None
+
+# Chunked transcription for long lectures: audio longer than
+# WHISPER_CHUNK_SECONDS is split into overlapping windows and transcribed
+# on WHISPER_CHUNK_WORKERS processes (each loads its own model; 1 disables)
+
+WHISPER_CHUNK_WORKERS = 1
+WHISPER_CHUNK_SECONDS = 300
+WHISPER_CHUNK_OVERLAP = 5
+
+# Chatbot retrieval: number of transcript chunks sent with each question
+
+RETRIEVAL_TOP_K = 4
+
+# Runtime data next to the transcripts (core/data/transcripts), kept out of git
+
+DATA_DIR = BASE_DIR / 'core' / 'data'
+
+# LLM response cache (chatbot, notes, quiz)
+
+LLM_CACHE_PATH = DATA_DIR / 'llm_cache.sqlite3'
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Quiz generation: chunk prompts in flight at once, and per-call timeout (s)
+
+QUIZ_LLM_CONCURRENCY = 4
+QUIZ_LLM_TIMEOUT = 20
+
+# Notes: section summaries in flight at once, and how long they stay cached (s)
+
+NOTES_LLM_CONCURRENCY = 4
+NOTES_SECTION_TTL_SECONDS = 30 * 24 * 3600
+
+# Quiz question bank: a starter set of basic questions after transcription,
+# topped up in the background when a student's watched range holds fewer
+# questions than QUIZ_BANK_MIN_QUESTIONS for the attempt's styles. Each
+# build makes a capped number of calls, paced well under the LLM limits.
+
+QUIZ_BANK_MIN_QUESTIONS = 12
+QUIZ_BANK_BUILD_ON_TRANSCRIBE = True
+QUIZ_BANK_TOP_UP = True
+QUIZ_BANK_INITIAL_CALLS = 8
+QUIZ_BANK_TOP_UP_CALLS = 12
+QUIZ_BANK_CALLS_PER_MINUTE = 10
+
+# LLM gateway: one pooled Groq client shared by chatbot, notes and quizzes.
+# Calls are scheduled to stay under the plan's rate limits (set these to
+# match your Groq plan); LLM_BASE_URL points it at another endpoint/mock.
+# Limits and priority order are shared by every process through
+# LLM_LIMITS_PATH; set it to None and each process gets its own buckets
+# (divide the limits by the number of worker processes).
+
+LLM_BASE_URL = None
+LLM_TOKENS_PER_MINUTE = 30000
+LLM_REQUESTS_PER_MINUTE = 30
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_RETRIES = 4
+LLM_QUEUE_TIMEOUT = 120
+LLM_LIMITS_PATH = DATA_DIR / 'llm_limits.sqlite3'
+
+# Emotion detection: faces from concurrent requests are classified together,
+# up to EMOTION_MAX_BATCH per forward pass or after EMOTION_MAX_WAIT_MS.
+# EMOTION_TFLITE_PATH (from `manage.py export_emotion_model`) is preferred
+# over the Keras checkpoints when it exists.
+
+EMOTION_MAX_BATCH = 32
+EMOTION_MAX_WAIT_MS = 10
+EMOTION_TFLITE_PATH = BASE_DIR / 'checkpoints' / 'emotion.tflite'
+EMOTION_NUM_THREADS = None
+
+# Face tracking for frames sent with a session_id: full (downscaled) Haar
+# detection at most every EMOTION_REDETECT_EVERY frames, ROI search between
+
+EMOTION_REDETECT_EVERY = 10
+EMOTION_DETECT_DOWNSCALE = 2
+
+# Semantic search / chatbot context: local sentence-embedding model on CPU.
+# Optional: without sentence-transformers installed the chatbot uses BM25
+# alone and /api/search/semantic/ returns 503.
+
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_SUMMARY_THRESHOLD = 0.6
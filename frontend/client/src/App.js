@@ -2,6 +2,44 @@ import { useState, useEffect, useRef } from "react";
 import ReactMarkdown from "react-markdown";
 import "./App.css";
 
+// Anonymous per-browser id so quiz attempts are counted per student
+const getStudentId = () => {
+  let id = localStorage.getItem("studentId");
+  if (!id) {
+    id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    localStorage.setItem("studentId", id);
+  }
+  return id;
+};
+
+// POST `body` and call onEvent(event, data) for each server-sent event
+const streamEvents = async (url, body, onEvent) => {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const blocks = buffer.split("\n\n");
+    buffer = blocks.pop();
+    for (const block of blocks) {
+      const event = block.match(/^event: (.*)$/m);
+      const data = block.match(/^data: (.*)$/m);
+      if (event && data) onEvent(event[1], JSON.parse(data[1]));
+    }
+  }
+};
+
 function App() {
   const [lectures, setLectures] = useState({});
   const [selectedLecture, setSelectedLecture] = useState("");
@@ -25,6 +63,7 @@ function App() {
   // Chatbot
   const [userQuestion, setUserQuestion] = useState("");
   const [botAnswer, setBotAnswer] = useState("");
+  const [botSources, setBotSources] = useState([]);
   const [botLoading, setBotLoading] = useState(false);
   const [chatOpen, setChatOpen] = useState(false);
 
@@ -94,6 +133,20 @@ function App() {
     }
   };
 
+  // ================= TRANSCRIPTION JOB =================
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const res = await fetch(`http://127.0.0.1:8000/api/jobs/${jobId}/`);
+      const job = await res.json();
+
+      if (job.status === "done" || job.status === "failed" || job.error) {
+        return job;
+      }
+
+      await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+  };
+
   // ================= LOAD LECTURE =================
   const loadLecture = async () => {
     if (!selectedLecture) return;
@@ -124,6 +177,15 @@ function App() {
       setVideoId(data.video_id);
       initPlayer(data.video_id);
 
+      // Transcription runs in the background; wait for the job first
+      if (data.job_id) {
+        const job = await waitForJob(data.job_id);
+        if (job.status !== "done") {
+          console.error("Transcription failed:", job.error);
+          return;
+        }
+      }
+
       // Load transcript with timeline
       fetch(`http://127.0.0.1:8000/api/transcript/${data.video_id}/`)
         .then(r => r.json())
@@ -162,6 +224,7 @@ function App() {
         body: JSON.stringify({
           video_id: videoId,
           watched_seconds: watchedSeconds,
+          student_id: getStudentId(),
         }),
       }
     );
@@ -180,24 +243,21 @@ function App() {
     setLoadingNotes(true);
     setNotes("");
 
-    const res = await fetch(
-      "http://127.0.0.1:8000/api/generate-notes/",
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
+    try {
+      await streamEvents(
+        "http://127.0.0.1:8000/api/generate-notes/stream/",
+        {
           video_id: videoId,
           watched_seconds: watchedSeconds,
           mode: mode,
-        }),
-      }
-    );
-
-    const data = await res.json();
-
-    if (data.status === "success") {
-      setNotes(data.notes);
-    } else {
+          student_id: getStudentId(),
+        },
+        (event, data) => {
+          if (event === "token") setNotes(prev => prev + data.text);
+          if (event === "error") setNotes("❌ Failed to generate notes");
+        }
+      );
+    } catch {
       setNotes("❌ Failed to generate notes");
     }
 
@@ -210,18 +270,27 @@ function App() {
 
     setBotLoading(true);
     setBotAnswer("");
+    setBotSources([]);
 
-    const res = await fetch("http://127.0.0.1:8000/api/chatbot/", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        video_id: videoId,
-        question: userQuestion,
-      }),
-    });
+    try {
+      await streamEvents(
+        "http://127.0.0.1:8000/api/chatbot/stream/",
+        {
+          video_id: videoId,
+          question: userQuestion,
+        },
+        (event, data) => {
+          if (event === "token") setBotAnswer(prev => prev + data.text);
+          // Rejected mid-stream: replace the partial answer
+          if (event === "abort") setBotAnswer(data.answer);
+          if (event === "done") setBotSources(data.sources || []);
+          if (event === "error") setBotAnswer("❌ No response");
+        }
+      );
+    } catch {
+      setBotAnswer("❌ No response");
+    }
 
-    const data = await res.json();
-    setBotAnswer(data.answer || "❌ No response");
     setBotLoading(false);
   };
 
@@ -537,6 +606,19 @@ function App() {
             {botAnswer && (
               <div className="bot-message">
                 <ReactMarkdown>{botAnswer}</ReactMarkdown>
+                {botSources.length > 0 && (
+                  <div className="bot-sources">
+                    {botSources.map((src, i) => (
+                      <button
+                        key={i}
+                        className="transcript-timestamp"
+                        onClick={() => seekToTime(src.start)}
+                      >
+                        {formatTime(src.start)}
+                      </button>
+                    ))}
+                  </div>
+                )}
               </div>
             )}
             {botLoading && <p className="thinking">🧠 Thinking...</p>}